@@ -29,7 +29,7 @@ setup(
     entry_points={
         'console_scripts': [
             'tilt-monitor=tilt_monitor.tilt_monitor:main',
-            'tilt-status=tilt_monitor.tilt_status:main',
+            'tilt-status=tilt_monitor.prompt:main',  # fast path for `--prompt`, otherwise tilt_status.main
         ],
     },
     app=['tilt_monitor/tilt_monitor.py'],
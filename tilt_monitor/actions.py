@@ -0,0 +1,118 @@
+"""Bulk resource actions (trigger, enable, disable) through the Tilt API, with bounded concurrency (stdlib only)"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+
+
+ACTIONS = ('trigger', 'enable', 'disable')
+RESULT_FIELDS = ('action', 'name', 'ok', 'seconds', 'error')
+
+
+class ActionBatch:
+    """One action on a set of resources; ``results`` (one dict of ``RESULT_FIELDS`` per resource) fill in as they complete"""
+    def __init__(self, action, names):
+        self.action = action
+        self.names = names
+        self.results = []
+        self.started = time.monotonic()
+        self.seconds = None  # set once every resource has a result
+
+    @property
+    def done(self):
+        return self.seconds is not None
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result['ok']]
+
+    def summary(self):
+        failed = self.failed
+        text = f'{self.action.capitalize()}: {len(self.results) - len(failed)} of {len(self.names)} resources done'
+        if failed:
+            text += '; Failed: ' + ', '.join(result['name'] for result in failed)
+        return text
+
+
+class ResourceActions:
+    """
+    Runs ``run_action(action, name)`` (raises on failure) for many resources, at most ``max_workers`` at a time.
+
+    ``submit()`` returns at once, so the caller's poll loop keeps running; Finished batches are collected with
+    ``pop_finished()``. ``run()`` blocks, yielding the results in completion order (for the CLI).
+    """
+    def __init__(self, run_action, log, max_workers=4):
+        self._run_action = run_action
+        self._log = log
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._batches = []
+
+    @property
+    def busy(self):
+        with self._lock:
+            return any(not batch.done for batch in self._batches)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='tilt-action')
+        return self._executor
+
+    def _run_one(self, action, name):
+        start = time.monotonic()
+        try:
+            self._run_action(action, name)
+            error = None
+        except Exception as action_err:
+            error = f'{action_err}' or type(action_err).__name__
+        return {'action': action, 'name': name, 'ok': error is None, 'seconds': round(time.monotonic() - start, 3), 'error': error}
+
+    def submit(self, action, names):
+        """Start ``action`` on the ``names`` resources in the background; Returns the ``ActionBatch``"""
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown resource action: {action} (expected one of {", ".join(ACTIONS)})')
+        batch = ActionBatch(action, list(dict.fromkeys(names)))
+        self._log(f'Running `{action}` on {len(batch.names)} resources: {", ".join(batch.names)}')
+        with self._lock:
+            self._batches.append(batch)
+        if not batch.names:
+            batch.seconds = 0.0
+            return batch
+        remaining = [len(batch.names)]
+
+        def _done(future):
+            result = future.result()
+            if not result['ok']:
+                self._log(f'`{action}` {result["name"]} failed: {result["error"]}', 'WARN')
+            with self._lock:
+                batch.results.append(result)
+                remaining[0] -= 1
+                if not remaining[0]:
+                    batch.seconds = round(time.monotonic() - batch.started, 3)
+                    self._log(f'{batch.summary()} ({batch.seconds} seconds)')
+
+        executor = self._get_executor()
+        for name in batch.names:
+            executor.submit(self._run_one, action, name).add_done_callback(_done)
+        return batch
+
+    def pop_finished(self):
+        """The batches finished since the last call"""
+        with self._lock:
+            finished = [batch for batch in self._batches if batch.done]
+            self._batches = [batch for batch in self._batches if not batch.done]
+        return finished
+
+    def run(self, action, names):
+        """Run ``action`` on the ``names`` resources, yielding each result as it completes"""
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown resource action: {action} (expected one of {", ".join(ACTIONS)})')
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix='tilt-action') as executor:
+            futures = [executor.submit(self._run_one, action, name) for name in dict.fromkeys(names)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
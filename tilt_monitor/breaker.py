@@ -0,0 +1,74 @@
+"""Circuit breaker for the Tilt API client"""
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the Tilt API while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing API, and probes it at a reduced rate until it recovers.
+
+    After ``failure_threshold`` consecutive failures the circuit opens: ``allow()`` returns False until
+    ``reset_timeout`` seconds have passed. Then a single probe is let through (half-open); If it succeeds the circuit
+    closes, otherwise it opens again and the timeout doubles (up to ``max_reset_timeout``).
+    """
+    def __init__(self, log, failure_threshold=3, reset_timeout=15, max_reset_timeout=120):
+        self._log = log
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def retry_in(self):
+        """Seconds until the next probe (0 unless the circuit is open)"""
+        if self.state != OPEN:
+            return 0
+        return max(0, int(self._opened_at + self.reset_timeout - time.monotonic()))
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._log('Tilt API circuit half-open; Probing')
+                return True
+            return False  # open, or a probe is already in flight
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                self._log(f'Tilt API circuit closed; Tilt is responding again (after {self.failures} failures)')
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = None
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open(f'Tilt API probe failed ({error})')
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open(f'Tilt API failed {self.failures} times in a row (last: {error})')
+
+    def _open(self, reason):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._log(f'{reason}; Circuit open, next probe in {self.reset_timeout} seconds', 'WARN')
@@ -0,0 +1,131 @@
+"""Typed configuration: schema validation, and derived values computed once per load (stdlib only)"""
+import os
+import shlex
+
+from tilt_monitor.filters import ResourceFilter
+from tilt_monitor.hooks import Hook
+
+
+def _positive(value):
+    return value > 0 or 'must be greater than 0'
+
+
+def _non_negative(value):
+    return value >= 0 or 'must not be negative'
+
+
+def _port(value):
+    return 0 <= value <= 65535 or 'must be a port number (0-65535), or 0 to disable'
+
+
+def _url(value):
+    return value.startswith(('http://', 'https://')) or 'must start with http:// or https://'
+
+
+def _str_values(value):
+    return all(isinstance(k, str) and isinstance(v, str) for k, v in value.items()) or 'must map names to string values'
+
+
+def _cmd_args(value):
+    try:
+        shlex.split(value)
+    except ValueError as split_err:
+        return f'is not a valid command line ({split_err})'
+    return True
+
+
+# (key, type, default, check); `check` returns True, or the reason the value is invalid
+SCHEMA = (
+    ('tilt_file_path', str, '', None),  # supports both file path and parent dir (with or without '/Tiltfile')
+    ('tilt_base_url', str, 'http://localhost:10350', _url),
+    ('tilt_context', str, 'docker-desktop', None),
+    ('keepalive_interval', int, 3, _positive),  # Interval for tilt status checks
+    ('sleep_interval', int, 30, _positive),  # Interval for status checks when tilt is down
+    ('tilt_cmd_args', str, '', _cmd_args),  # For any other args other than -f and --context
+    ('env_vars', dict, {}, _str_values),
+    ('metrics_port', int, 0, _port),  # Local OpenMetrics endpoint port (0 = disabled)
+    ('perf_stats', bool, True, None),  # Collect hot-path timing stats (shown in 'Performance Stats')
+    ('ipc_socket', bool, True, None),  # Serve the latest status to local clients (e.g. `tilt-status`) over a Unix socket
+    ('prompt_status', bool, True, None),  # Keep a tiny status file for shell prompts (`tilt-status --prompt`)
+    ('icon_badge', bool, True, None),  # Show the number of errored resources on the red icon
+    ('log_tail_lines', int, 20, _non_negative),  # Number of log lines kept per failing resource (0 = disabled)
+    ('startup_profiler', bool, True, None),  # Report the time-to-ready of each resource after 'Tilt Up'
+    ('warm_start', bool, True, None),  # Show the last known status on launch (marked stale) until the first status check
+    ('action_concurrency', int, 4, _positive),  # Max resources triggered/enabled/disabled at a time by bulk actions
+    ('hooks', list, [], None),  # Commands/webhooks run on state transitions; validated by `Hook.from_config`
+    ('hook_workers', int, 2, _positive),  # Max hooks running at a time
+    ('history_days', int, 30, _non_negative),  # Days of resource transitions kept for `tilt-status history` (0 = disabled)
+    ('resource_filters', dict, {  # Resources to ignore everywhere (menu, health, counts, metrics, `tilt-status`)
+        'include': [],  # Name globs; if any (or 'include_labels') are given, only matching resources are kept
+        'exclude': [],  # Name globs
+        'include_labels': [],
+        'exclude_labels': [],
+        'skip_disabled': True,
+    }, None),  # validated by `ResourceFilter.from_config`
+)
+
+DEFAULT_CONFIG = {key: default for key, _, default, _ in SCHEMA}
+
+
+def normalize_tilt_file_dir(path):
+    """The directory of the Tiltfile, for either the file path or its parent dir"""
+    if not path:
+        return ''
+    path = os.path.expanduser(path)
+    if path.endswith('Tiltfile'):
+        path = os.path.dirname(path)
+    return os.path.normpath(path)
+
+
+class Config:
+    """
+    Validated configuration values, as attributes named after the config keys, plus derived values:
+    ``tilt_file_dir``, ``base_url``, ``status_url``, ``view_url``, ``ui_url``, ``tilt_up_args``, ``resource_filter`` and
+    ``transition_hooks``.
+
+    Invalid values are replaced by their defaults and reported in ``errors`` (one message per problem).
+    """
+    __slots__ = tuple(key for key, _, _, _ in SCHEMA) + (
+        'tilt_file_dir', 'base_url', 'status_url', 'view_url', 'ui_url', 'tilt_up_args', 'resource_filter', 'transition_hooks', 'errors',
+    )
+
+    def __init__(self, values=None):
+        values = values or {}
+        self.errors = []
+        for key, value_type, default, check in SCHEMA:
+            value = values.get(key, default)
+            reason = self._check(value, value_type, check)
+            if reason is not True:
+                self.errors.append(f'"{key}" {reason}; Using default value: {default!r}')
+                value = default
+            setattr(self, key, value)
+        try:
+            self.resource_filter = ResourceFilter.from_config({'resource_filters': self.resource_filters})
+        except ValueError as filter_err:
+            self.errors.append(f'"resource_filters": {filter_err}; Using the default filters')
+            self.resource_filter = ResourceFilter()
+        try:
+            self.transition_hooks = Hook.from_config({'hooks': self.hooks})
+        except ValueError as hook_err:
+            self.errors.append(f'"hooks": {hook_err}; No hooks will run')
+            self.transition_hooks = ()
+
+        self.tilt_file_dir = normalize_tilt_file_dir(self.tilt_file_path)
+        self.tilt_up_args = shlex.split(self.tilt_cmd_args) + (['--context', self.tilt_context] if self.tilt_context else [])
+        self.set_base_url(self.tilt_base_url)
+
+    @staticmethod
+    def _check(value, value_type, check):
+        if type(value) is not value_type:  # strict: e.g. neither "3" nor True is an int
+            return f'must be of type {value_type.__name__} (got {type(value).__name__}: {value!r})'
+        return True if check is None else check(value)
+
+    def set_base_url(self, url):
+        """Point all Tilt URLs at ``url`` (e.g. for `--base-url`)"""
+        self.base_url = url.rstrip('/')
+        self.status_url = f'{self.base_url}/api/view'  # no logs; `LogTailer` reads them incrementally
+        self.view_url = f'{self.base_url}/api/view'
+        self.ui_url = f'{self.base_url}/overview'
+
+    def resource_ui_url(self, r_name):
+        return f'{self.base_url}/r/{r_name}/overview'
@@ -0,0 +1,222 @@
+"""UI-agnostic Tilt monitoring engine, shared by the menu bar app and the headless daemon"""
+from datetime import datetime
+import time
+
+from tilt_monitor.breaker import CircuitOpenError
+from tilt_monitor.log_tail import LogTailer
+from tilt_monitor.resources import STATE_ERROR
+from tilt_monitor.startup import StartupProfiler
+from tilt_monitor.tilt_monitor import (
+    app, api_breaker, config, log, perf, tilt_processes, api_get_tilt_logs, api_get_tilt_status, get_tilt_status, is_tilt_healthy,
+    set_tilt_running, is_tiltfile_path_valid, run_tilt_command, update_snapshot, history, hook_runner, resource_actions, startup_reports_dir,
+)
+
+
+HEALTH_TEXT = {True: 'ok', False: 'error', None: 'pending'}
+
+
+class MonitorEngine:
+    """
+    Runs the poll/classify/notify cycle; Front ends call ``tick()`` from their own timer or loop.
+
+    Transitions are passed to listeners as event dicts (``event`` is one of ``running``, ``health``, ``resource``,
+    ``poll_error``, ``circuit``, ``startup``, ``action``, ``tilt_up``, ``tilt_down``), so they can be shown, logged or serialized (e.g. as NDJSON).
+    """
+    def __init__(self, short_interval=None, long_interval=None):
+        self.short_interval = short_interval or config.keepalive_interval
+        self.long_interval = long_interval or config.sleep_interval
+        self.tilt_starting = False
+        self.log_tailer = LogTailer(api_get_tilt_logs, config.log_tail_lines)
+        self.startup = StartupProfiler(startup_reports_dir, log)
+        self._listeners = []
+        self._resource_list = []
+        self._resources = {}  # name -> Resource, as of the last `_notify_resources`
+        self._failing = frozenset()
+        if hook_runner.hooks:
+            self.add_listener(hook_runner)  # only queues the matching hooks; they run on the runner's own threads
+        if config.history_days:
+            self.add_listener(history)  # batched; written on the recorder's own thread
+        if app.snapshot['stale']:  # restored (see `restore_snapshot`): only report what changed since
+            self._set_resources(app.snapshot['resources'])
+
+    @property
+    def interval(self):
+        """Seconds until the next ``tick()``: short while Tilt runs, 1 while it is starting (or profiled), long otherwise"""
+        if app.tilt_running:
+            return 1 if self.startup.active else self.short_interval
+        return 1 if self.tilt_starting else self.long_interval
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def emit(self, event, **fields):
+        payload = {'ts': datetime.now().astimezone().isoformat(timespec='milliseconds'), 'event': event, **fields}
+        for callback in self._listeners:
+            try:
+                callback(payload)
+            except Exception as cb_err:
+                log(f'Error in monitor event listener: {cb_err}', 'ERROR', cb_err)
+
+    def poll(self):
+        """
+        Fetch the Tilt view: the only network request of a tick, and the only part that may run off the front end's
+        main thread (see ``tick(polled)``).
+        :return: ``(data, error)``; ``data`` is None if ``api_get_tilt_status`` raised ``error``
+        """
+        try:
+            return api_get_tilt_status(), None  # a single request: it also tells whether Tilt is running
+        except Exception as api_err:
+            return None, api_err
+
+    def tick(self, polled=None):
+        """
+        Run a single poll/classify/notify cycle.
+        :param polled: The result of an earlier ``poll()`` to classify, instead of polling now
+        :return: A dict with ``running`` (bool), ``healthy`` (True/False/None), ``running_changed`` (bool),
+                 ``started`` (True once a `tilt up` we issued became healthy or errored), ``groups_changed`` (a
+                 resource's labels or state changed, see ``app.label_index``), ``logs_changed`` (a failing resource's
+                 log tail changed), ``circuit_changed`` (see ``api_breaker``), ``actions`` (the ``ActionBatch``es finished
+                 since the last tick, see ``run_action``) and ``error`` (the API error, if any)
+        """
+        result = {'running': app.tilt_running, 'healthy': app.tilt_healthy, 'running_changed': False, 'started': False,
+                  'groups_changed': False, 'logs_changed': False, 'circuit_changed': False, 'actions': [], 'error': None}
+        result['actions'] = resource_actions.pop_finished()
+        for batch in result['actions']:
+            self.emit('action', action=batch.action, seconds=batch.seconds, results=batch.results)
+        if tilt_processes.busy:
+            return result  # Tilt is being stopped; the state is refreshed once it is done
+
+        start = time.monotonic()
+        prv_tilt_running = app.tilt_running
+        prv_tilt_healthy = app.tilt_healthy
+        prv_groups_generation = app.label_index.generation
+        prv_circuit_state = api_breaker.state
+        data, poll_err = polled if polled is not None else self.poll()
+        set_tilt_running(poll_err)
+        if app.tilt_running:
+            try:
+                if poll_err is not None:
+                    raise poll_err
+                result_list = get_tilt_status(data)
+                with perf.timer('healthy'):
+                    result['healthy'] = is_tilt_healthy(result_list)
+                update_snapshot(result_list, result['healthy'])
+                self._notify_resources(result_list)
+                result['logs_changed'] = self._update_log_tails(result_list)
+                if self.startup.active:
+                    self._profile_startup(result_list)
+                if self.tilt_starting and result['healthy'] is not None:
+                    self.tilt_starting = False
+                    result['started'] = True
+            except Exception as api_err:
+                if not isinstance(api_err, CircuitOpenError):  # the breaker logs its own state changes
+                    log(f'Error getting Tilt status: {api_err}', 'ERROR', api_err)
+                result['healthy'] = False  # API error indicates unhealthy state
+                result['error'] = api_err
+                self.emit('poll_error', error=f'{api_err}')
+        else:
+            update_snapshot()
+            self._notify_resources([])
+            result['logs_changed'] = self._update_log_tails([])
+            result['healthy'] = None
+
+        result['running'] = app.tilt_running
+        result['groups_changed'] = app.label_index.generation != prv_groups_generation
+        if api_breaker.state != prv_circuit_state:
+            result['circuit_changed'] = True
+            self.emit('circuit', state=api_breaker.state, failures=api_breaker.failures, retry_in=api_breaker.retry_in)
+        if prv_tilt_running != app.tilt_running:
+            result['running_changed'] = True
+            self.emit('running', running=bool(app.tilt_running))
+        if app.tilt_running and prv_tilt_healthy != app.tilt_healthy:
+            self.emit('health', healthy=HEALTH_TEXT[app.tilt_healthy])
+        if config.history_days:
+            history.record_tick(app.tilt_running, result['healthy'], app.snapshot['state_counts'], time.monotonic() - start)
+        return result
+
+    def run_action(self, action, names):
+        """
+        Trigger, enable or disable the ``names`` resources in the background (``config.action_concurrency`` at a time);
+        Polling goes on meanwhile, and ``tick()`` reports the batch once every resource has a result.
+        :return: The ``ActionBatch``
+        """
+        return resource_actions.submit(action, names)
+
+    def _notify_resources(self, result_list):
+        if result_list is self._resource_list:
+            return  # `get_tilt_status` returns the same list while no resource changed
+        resources = {r.name: r for r in result_list}
+        for r_name, record in resources.items():
+            previous = self._resources.get(r_name)
+            if previous is None or (previous.label, previous.update, previous.runtime) != (record.label, record.update, record.runtime):
+                self.emit('resource', resource=r_name, label=record.label, update_status=record.update_status, runtime_status=record.runtime_status,
+                          state=record.state_name, previous=None if previous is None else {'update_status': previous.update_status, 'runtime_status': previous.runtime_status})
+        for r_name in self._resources.keys() - resources.keys():
+            previous = self._resources[r_name]
+            self.emit('resource', resource=r_name, label=previous.label, update_status=None, runtime_status=None, state=None,
+                      previous={'update_status': previous.update_status, 'runtime_status': previous.runtime_status})
+        self._set_resources(result_list, resources)
+
+    def _set_resources(self, result_list, resources=None):
+        self._resource_list = result_list
+        self._resources = resources if resources is not None else {r.name: r for r in result_list}
+        self._failing = frozenset(r.name for r in result_list if r.state == STATE_ERROR)
+
+    def _update_log_tails(self, result_list):
+        try:
+            with perf.timer('log_tail'):
+                return self.log_tailer.update(self._failing)  # follows `_notify_resources`
+        except Exception as tail_err:
+            log(f'Error tailing logs of failing resources: {tail_err}', 'ERROR', tail_err)
+            return False
+
+    def _profile_startup(self, result_list):
+        try:
+            report_path = self.startup.observe(result_list)
+        except Exception as profile_err:
+            log(f'Error profiling Tilt startup: {profile_err}', 'ERROR', profile_err)
+            self.startup.finish()
+            return
+        if report_path:
+            report = self.startup.last_report
+            self.emit('startup', completed=report['completed'], time_to_green=report['time_to_green'],
+                      slowest=report['slowest'][:3], report=report_path)
+
+    def poll_started(self):
+        """Return True once the Tilt API answers after `tilt up` (used with a 1 second timer while Tilt is starting)"""
+        try:
+            api_get_tilt_status(timeout=1)
+        except Exception:
+            return False  # API not available yet, will try again on next poll
+        app.tilt_running = True
+        log('Tilt API is now available')
+        return True
+
+    def tilt_up(self):
+        """Run `tilt up`; Returns False if the Tiltfile path is invalid or the command failed"""
+        if not is_tiltfile_path_valid(config.tilt_file_dir):
+            log("Cannot 'tilt up': 'tilt_file_path' is not configured or is invalid.", 'WARN')
+            return False
+        log('Starting Tilt')
+        success, _ = run_tilt_command('up')
+        if success:
+            self.tilt_starting = True
+            if config.startup_profiler:
+                self.startup.start(config.tilt_file_dir)
+            self.emit('tilt_up')
+        return success
+
+    def tilt_down(self):
+        """Stop Tilt in the background (see ``TiltProcessManager.stop``); Returns False if it could not be stopped"""
+        log('Stopping Tilt')
+        if tilt_processes.busy:
+            log('Tilt is already being stopped')
+            return False
+        success, _ = run_tilt_command('down')  # terminates our own `tilt up` process group if there is one
+        if not success:
+            return False  # Failed to stop Tilt
+        self.tilt_starting = False
+        self.startup.finish()  # keeps the report of an unfinished startup, if still profiling
+        app.tilt_running = False
+        self.emit('tilt_down')
+        return True
@@ -0,0 +1,57 @@
+"""Config-driven include/exclude rules for Tilt resources, compiled once (stdlib only)"""
+from fnmatch import translate
+import re
+
+
+def _compile_globs(patterns):
+    """One regex for a list of name globs (None if there are none)"""
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{translate(p)})' for p in patterns))
+
+
+class ResourceFilter:
+    """
+    Decides which resources the monitor cares about.
+
+    A resource is kept if it matches ``include`` (name globs) or ``include_labels`` (when either is given), and matches
+    neither ``exclude`` nor ``exclude_labels``. ``skip_disabled`` is applied by ``ResourceTable``, which keeps disabled
+    resources apart (rather than dropping them here) so they can still be enabled.
+    """
+    def __init__(self, include=(), exclude=(), include_labels=(), exclude_labels=(), skip_disabled=True):
+        self._include = _compile_globs(include)
+        self._exclude = _compile_globs(exclude)
+        self._include_labels = frozenset(include_labels)
+        self._exclude_labels = frozenset(exclude_labels)
+        self._has_includes = bool(self._include or self._include_labels)
+        self.skip_disabled = skip_disabled
+        self.active = bool(self._has_includes or self._exclude or self._exclude_labels)
+
+    @classmethod
+    def from_config(cls, config):
+        rules = config.get('resource_filters') or {}
+        unknown = rules.keys() - {'include', 'exclude', 'include_labels', 'exclude_labels', 'skip_disabled'}
+        if unknown:
+            raise ValueError(f'Unknown resource filter(s): {", ".join(sorted(unknown))}')
+        for key in ('include', 'exclude', 'include_labels', 'exclude_labels'):
+            if not isinstance(rules.get(key, []), list) or not all(isinstance(v, str) for v in rules.get(key, [])):
+                raise ValueError(f'Resource filter "{key}" must be a list of strings')
+        return cls(rules.get('include', ()), rules.get('exclude', ()), rules.get('include_labels', ()),
+                   rules.get('exclude_labels', ()), bool(rules.get('skip_disabled', True)))
+
+    def keep(self, name, labels):
+        if self._has_includes and not (
+                (self._include and self._include.match(name)) or not self._include_labels.isdisjoint(labels)):
+            return False
+        if self._exclude and self._exclude.match(name):
+            return False
+        return self._exclude_labels.isdisjoint(labels)
+
+    def apply(self, resources, get_labels):
+        """
+        Filter a list of Tilt ``uiResources`` (returns the list itself when nothing is filtered).
+        :param get_labels: Function that returns the labels of a resource from its ``metadata``
+        """
+        if not self.active:
+            return resources
+        return [r for r in resources if self.keep(r['metadata']['name'], get_labels(r['metadata']))]
@@ -0,0 +1,90 @@
+"""Headless front end: runs the monitoring engine on a plain loop and writes transitions as NDJSON"""
+import json
+import signal
+import sys
+import threading
+import time
+
+from tilt_monitor.engine import MonitorEngine
+from tilt_monitor.tilt_monitor import (
+    app, log, perf, profiler, tilt_processes, check_interval, record_launch_time, stop_services, perf_stats_file, PERF_DUMP_INTERVAL, QUIT_TIMEOUT,
+)
+
+
+class NdjsonWriter:
+    """Listener writing each engine event as one JSON line (to stdout for ``-``), flushed immediately"""
+    def __init__(self, path='-'):
+        self.path = path
+        self._file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class HeadlessMonitor:
+    """Drives ``MonitorEngine.tick()`` at the engine's current interval until stopped (SIGINT/SIGTERM or ``stop()``)"""
+    def __init__(self, engine, max_ticks=None):
+        self.engine = engine
+        self.max_ticks = max_ticks
+        self.ticks = 0
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run(self, up_on_start=False):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        self.engine.emit('start', interval=self.engine.interval)
+        if up_on_start:
+            self.engine.tilt_up()
+        perf_dumped_at = 0.0
+        while not self._stop.is_set():
+            try:
+                with profiler.sample('tick'), perf.timer('tick'):
+                    self.engine.tick()
+            except Exception as tick_err:
+                log(f'{tick_err}', 'ERROR', tick_err)
+                self.engine.emit('tick_error', error=f'{tick_err}')
+            self.ticks += 1
+            if self.ticks == 1:
+                record_launch_time('first_status')
+            if self.max_ticks is not None and self.ticks >= self.max_ticks:
+                break
+
+            if perf.enabled and time.monotonic() - perf_dumped_at >= PERF_DUMP_INTERVAL:
+                perf_dumped_at = time.monotonic()
+                perf.dump(perf_stats_file)
+            interval = self.engine.interval
+            check_interval.set(interval)
+            self._stop.wait(interval)
+        self.shutdown()
+
+    def shutdown(self):
+        """Stop Tilt if this process started it, waiting for at most QUIT_TIMEOUT seconds"""
+        if tilt_processes.is_alive() or tilt_processes.busy:
+            self.engine.tilt_down()
+            if not tilt_processes.wait(QUIT_TIMEOUT):
+                log(f'Tilt did not stop within {QUIT_TIMEOUT} seconds; Exiting anyway', 'WARN')
+        stop_services()
+        self.engine.emit('stop', ticks=self.ticks, tilt_running=bool(app.tilt_running))
+
+
+def run_headless(short_interval, long_interval, output='-', up_on_start=False, max_ticks=None):
+    writer = NdjsonWriter(output)
+    engine = MonitorEngine(short_interval, long_interval)
+    engine.add_listener(writer)
+    try:
+        HeadlessMonitor(engine, max_ticks=max_ticks).run(up_on_start=up_on_start)
+    finally:
+        writer.close()
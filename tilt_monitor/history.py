@@ -0,0 +1,244 @@
+"""
+On-disk status history: resource transitions and per-tick metrics in SQLite, with batched writes and retention
+(stdlib only).
+
+Tables::
+
+    transitions(ts, kind, resource, state, update_status, runtime_status)  -- `resource`, `running` and `health` events
+    periods(resource, state, started, ended)                                -- derived from the resource transitions
+    ticks(ts, running, healthy, ok, pending, error, warn, seconds)          -- one row per status check
+    ticks_hourly(hour, ticks, running, healthy, error_sum, error_max, seconds_sum, seconds_max)
+
+Times are epoch seconds; ``ended`` is NULL while a resource is still in the period's state. Ticks older than
+``raw_hours`` are downsampled into ``ticks_hourly``; Transitions, periods and hourly rows older than ``retention_days``
+are deleted.
+"""
+import sqlite3
+import threading
+import time
+
+from tilt_monitor.hooks import event_state
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transitions (
+    ts REAL NOT NULL, kind TEXT NOT NULL, resource TEXT, state TEXT, update_status TEXT, runtime_status TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_resource_ts ON transitions (resource, ts);
+CREATE INDEX IF NOT EXISTS transitions_ts ON transitions (ts);
+CREATE TABLE IF NOT EXISTS periods (resource TEXT NOT NULL, state TEXT NOT NULL, started REAL NOT NULL, ended REAL);
+CREATE INDEX IF NOT EXISTS periods_state_started ON periods (state, started, resource, ended);
+CREATE INDEX IF NOT EXISTS periods_resource_state ON periods (resource, state, started, ended);
+CREATE UNIQUE INDEX IF NOT EXISTS periods_open ON periods (resource) WHERE ended IS NULL;
+CREATE TABLE IF NOT EXISTS ticks (
+    ts REAL NOT NULL, running INTEGER, healthy INTEGER, ok INTEGER, pending INTEGER, error INTEGER, warn INTEGER, seconds REAL
+);
+CREATE INDEX IF NOT EXISTS ticks_ts ON ticks (ts);
+CREATE TABLE IF NOT EXISTS ticks_hourly (
+    hour INTEGER PRIMARY KEY, ticks INTEGER, running INTEGER, healthy INTEGER, error_sum INTEGER, error_max INTEGER,
+    seconds_sum REAL, seconds_max REAL
+);
+'''
+HISTORY_EVENTS = ('resource', 'running', 'health')
+MAX_PENDING = 10000  # rows kept in memory while the database cannot be written; beyond that new ticks are dropped
+MAINTENANCE_INTERVAL = 3600  # seconds between downsampling/retention runs
+
+
+class HistoryRecorder:
+    """
+    Engine listener that records transitions (and ``record_tick`` metrics) to the SQLite database at ``path``.
+
+    Recording only appends to an in-memory batch; A single writer thread (started on first use) writes the batch in one
+    transaction every ``flush_interval`` seconds, and downsamples/prunes old rows every hour.
+    """
+    def __init__(self, path, log, retention_days=30, raw_hours=24, flush_interval=10):
+        self.path = path
+        self._log = log
+        self.retention_days = retention_days
+        self.raw_hours = raw_hours
+        self.flush_interval = flush_interval
+        self._transitions = []
+        self._ticks = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self._open = None  # resource -> state of its open period (writer thread only)
+
+    def __call__(self, event):
+        if event['event'] not in HISTORY_EVENTS:
+            return
+        row = (time.time(), event['event'], event.get('resource'), event_state(event), event.get('update_status'), event.get('runtime_status'))
+        with self._lock:
+            if len(self._transitions) < MAX_PENDING:
+                self._transitions.append(row)
+            self._start()
+
+    def record_tick(self, running, healthy, state_counts, seconds):
+        """:param state_counts: ``app.snapshot['state_counts']`` (empty while Tilt is not running)"""
+        row = (time.time(), int(bool(running)), None if healthy is None else int(healthy), state_counts.get('ok', 0),
+               state_counts.get('pending', 0), state_counts.get('error', 0), state_counts.get('warn', 0), seconds)
+        with self._lock:
+            if len(self._ticks) < MAX_PENDING:
+                self._ticks.append(row)
+            self._start()
+
+    def _start(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._work, name='tilt-history', daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        try:
+            conn = connect(self.path)
+        except Exception as db_err:
+            self._log(f'Status history disabled; cannot open {self.path}: {db_err}', 'ERROR', db_err)
+            return
+        maintained_at = None
+        try:
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self._flush(conn)
+                if maintained_at is None or time.monotonic() - maintained_at >= MAINTENANCE_INTERVAL:
+                    maintained_at = time.monotonic()
+                    self._maintain(conn)
+                if self._stopped:
+                    break
+        finally:
+            conn.close()
+
+    def _flush(self, conn):
+        with self._lock:
+            transitions, self._transitions = self._transitions, []
+            ticks, self._ticks = self._ticks, []
+        if not (transitions or ticks):
+            return
+        try:
+            with conn:
+                conn.executemany('INSERT INTO transitions VALUES (?, ?, ?, ?, ?, ?)', transitions)
+                conn.executemany('INSERT INTO ticks VALUES (?, ?, ?, ?, ?, ?, ?, ?)', ticks)
+                self._update_periods(conn, transitions)
+        except sqlite3.Error as db_err:
+            self._log(f'Error writing the status history: {db_err}', 'ERROR', db_err)
+            self._open = None  # rolled back; reloaded on the next flush
+            with self._lock:  # retried on the next flush
+                self._transitions[:0] = transitions[:MAX_PENDING - len(self._transitions)]
+                self._ticks[:0] = ticks[:MAX_PENDING - len(self._ticks)]
+
+    def _update_periods(self, conn, transitions):
+        """Close the open period of each resource whose state changed, and open one for its new state"""
+        if self._open is None:
+            self._open = dict(conn.execute('SELECT resource, state FROM periods WHERE ended IS NULL'))
+        for ts, kind, resource, state, _, _ in transitions:
+            if kind != 'resource' or self._open.get(resource) == state:
+                continue
+            if resource in self._open:
+                conn.execute('UPDATE periods SET ended = ? WHERE resource = ? AND ended IS NULL', (ts, resource))
+            conn.execute('INSERT INTO periods VALUES (?, ?, ?, NULL)', (resource, state, ts))
+            self._open[resource] = state
+
+    def _maintain(self, conn):
+        now = time.time()
+        raw_until = (now - self.raw_hours * 3600) // 3600 * 3600  # whole hours only, so each hour is downsampled at once
+        keep_from = now - self.retention_days * 86400
+        try:
+            with conn:
+                conn.execute('''
+                    INSERT INTO ticks_hourly
+                    SELECT CAST(ts / 3600 AS INTEGER) * 3600, COUNT(*), TOTAL(running), TOTAL(healthy), TOTAL(error), MAX(error),
+                           TOTAL(seconds), MAX(seconds)
+                    FROM ticks WHERE ts < ? GROUP BY 1
+                    ON CONFLICT (hour) DO UPDATE SET  -- NULL-safe: `healthy` is NULL in a tick while Tilt is not running
+                        ticks = COALESCE(ticks, 0) + COALESCE(excluded.ticks, 0),
+                        running = COALESCE(running, 0) + COALESCE(excluded.running, 0),
+                        healthy = COALESCE(healthy, 0) + COALESCE(excluded.healthy, 0),
+                        error_sum = COALESCE(error_sum, 0) + COALESCE(excluded.error_sum, 0),
+                        error_max = MAX(COALESCE(error_max, excluded.error_max), COALESCE(excluded.error_max, error_max)),
+                        seconds_sum = COALESCE(seconds_sum, 0) + COALESCE(excluded.seconds_sum, 0),
+                        seconds_max = MAX(COALESCE(seconds_max, excluded.seconds_max), COALESCE(excluded.seconds_max, seconds_max))
+                ''', (raw_until,))
+                conn.execute('DELETE FROM ticks WHERE ts < ?', (raw_until,))
+                conn.execute('DELETE FROM ticks_hourly WHERE hour < ?', (keep_from,))
+                conn.execute('DELETE FROM transitions WHERE ts < ?', (keep_from,))
+                conn.execute('DELETE FROM periods WHERE ended < ?', (keep_from,))
+        except sqlite3.Error as db_err:
+            self._log(f'Error pruning the status history: {db_err}', 'ERROR', db_err)
+
+    def close(self):
+        """Write what is pending, and stop the writer thread"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        if thread is not None:
+            self._wake.set()
+            thread.join(5)
+
+
+def connect(path, readonly=False):
+    if readonly:
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')  # readers (`tilt-status history`) never block the writer
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def state_periods(conn, since, until, state='error', names=None):
+    """
+    How often, and for how long, each resource was in ``state`` between ``since`` and ``until`` (epoch seconds).
+    A period lasts until the resource's next transition, so it includes time the monitor was not running.
+    :param names: Only these resources (listed even if never in ``state``), or None for all that were
+    :return: Dicts of ``name``, ``count`` (times it entered ``state``), ``seconds``, ``share`` (of the time span) and
+             ``last`` (when it last entered ``state``, or None), worst first
+    """
+    where, params = '', {'state': state, 'since': since, 'until': until}
+    if names:
+        where = f' AND resource IN ({", ".join(f":n{i}" for i in range(len(names)))})'
+        params.update((f'n{i}', name) for i, name in enumerate(names))
+    rows = conn.execute(f'''
+        SELECT resource, SUM(started >= :since), TOTAL(MIN(COALESCE(ended, :until), :until) - MAX(started, :since)),
+               MAX(CASE WHEN started >= :since THEN started END)
+        FROM periods WHERE state = :state AND started < :until AND (ended IS NULL OR ended > :since){where}
+        GROUP BY resource
+    ''', params)
+    span = max(until - since, 1e-9)
+    results = {name: {'name': name, 'count': 0, 'seconds': 0.0, 'share': 0.0, 'last': None} for name in names or ()}
+    for name, count, seconds, last in rows:
+        results[name] = {'name': name, 'count': count, 'seconds': seconds, 'share': seconds / span, 'last': last}
+    return sorted(results.values(), key=lambda r: (-r['seconds'], -r['count'], r['name']))
+
+
+def list_transitions(conn, since, until, names=None):
+    """The recorded transitions between ``since`` and ``until``, oldest first (``running``/``health`` ones only without ``names``)"""
+    if names:
+        query = f'''SELECT ts, kind, resource, state, update_status, runtime_status FROM transitions
+                    WHERE resource IN ({", ".join("?" * len(names))}) AND ts >= ? AND ts < ? ORDER BY ts'''
+        params = [*names, since, until]
+    else:
+        query = 'SELECT ts, kind, resource, state, update_status, runtime_status FROM transitions WHERE ts >= ? AND ts < ? ORDER BY ts'
+        params = [since, until]
+    return [dict(zip(('ts', 'kind', 'resource', 'state', 'update_status', 'runtime_status'), row)) for row in conn.execute(query, params)]
+
+
+def tick_summary(conn, since, until):
+    """
+    Status check metrics between ``since`` and ``until`` (raw and downsampled ticks together; hourly rows count whole):
+    ``ticks``, ``running`` (share of ticks), ``healthy`` (share of running ticks), ``avg_errors``/``max_errors`` (errored
+    resources per tick) and ``avg_seconds``/``max_seconds`` (tick duration)
+    """
+    raw = conn.execute('SELECT COUNT(*), SUM(running), SUM(healthy), SUM(error), MAX(error), SUM(seconds), MAX(seconds) '
+                       'FROM ticks WHERE ts >= ? AND ts < ?', (since, until)).fetchone()
+    hourly = conn.execute('SELECT SUM(ticks), SUM(running), SUM(healthy), SUM(error_sum), MAX(error_max), SUM(seconds_sum), MAX(seconds_max) '
+                          'FROM ticks_hourly WHERE hour >= ? AND hour < ?', (since // 3600 * 3600, until)).fetchone()
+    ticks, running, healthy, error_sum, _, seconds_sum, _ = (sum(v or 0 for v in pair) for pair in zip(raw, hourly))
+    return {
+        'ticks': ticks,
+        'running': running / ticks if ticks else None,
+        'healthy': healthy / running if running else None,
+        'avg_errors': error_sum / ticks if ticks else None,
+        'max_errors': max((v for v in (raw[4], hourly[4]) if v is not None), default=None),
+        'avg_seconds': seconds_sum / ticks if ticks else None,
+        'max_seconds': max((v for v in (raw[6], hourly[6]) if v is not None), default=None),
+    }
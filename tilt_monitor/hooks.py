@@ -0,0 +1,196 @@
+"""Config-defined hooks run on Tilt state transitions, in a bounded worker pool (stdlib only)"""
+from fnmatch import fnmatchcase
+import json
+import os
+import queue
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+# Engine event -> state field matched by a hook's ``state``
+HOOK_EVENTS = {'health': 'healthy', 'resource': 'state', 'running': 'running'}
+HOOK_STATES = {
+    'health': ('ok', 'error', 'pending'),
+    'resource': ('ok', 'pending', 'error', 'unknown', 'disabled', 'removed'),
+    'running': ('up', 'down'),
+}
+
+
+class Hook:
+    """
+    One configured hook: runs ``command`` (a shell command) or POSTs to ``url`` when an engine event matches.
+
+    ``on`` is the event (``health``, ``resource`` or ``running``); ``state`` optionally narrows it (e.g. ``ok``), and
+    ``resource`` (a name glob) narrows resource events.
+    """
+    __slots__ = ('name', 'on', 'state', 'resource', 'command', 'url', 'timeout')
+
+    def __init__(self, on, state=None, resource=None, command=None, url=None, timeout=60, name=None):
+        if on not in HOOK_EVENTS:
+            raise ValueError(f'"on" must be one of {", ".join(HOOK_EVENTS)} (got {on!r})')
+        if state is not None and state not in HOOK_STATES[on]:
+            raise ValueError(f'"state" of a {on} hook must be one of {", ".join(HOOK_STATES[on])} (got {state!r})')
+        if resource is not None and (on != 'resource' or not isinstance(resource, str)):
+            raise ValueError('"resource" (a name glob) only applies to resource hooks')
+        if bool(command) == bool(url):
+            raise ValueError('exactly one of "command" and "url" is required')
+        if type(timeout) not in (int, float) or timeout <= 0:
+            raise ValueError(f'"timeout" must be a positive number of seconds (got {timeout!r})')
+        self.on = on
+        self.state = state
+        self.resource = resource
+        self.command = command
+        self.url = url
+        self.timeout = timeout
+        self.name = name or f'{on}{":" + state if state else ""} -> {command or url}'
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Hooks from the ``hooks`` list of the configuration; Raises ValueError on an invalid entry"""
+        hooks = []
+        for i, entry in enumerate(cfg.get('hooks') or []):
+            if not isinstance(entry, dict):
+                raise ValueError(f'hook #{i + 1} must be an object')
+            unknown = entry.keys() - set(cls.__slots__)
+            if unknown:
+                raise ValueError(f'hook #{i + 1} has unknown keys: {", ".join(sorted(unknown))}')
+            try:
+                hooks.append(cls(**entry))
+            except (TypeError, ValueError) as hook_err:
+                raise ValueError(f'hook #{i + 1}: {hook_err}') from None
+        return tuple(hooks)
+
+    def matches(self, event):
+        if event['event'] != self.on:
+            return False
+        if self.state is not None and event_state(event) != self.state:
+            return False
+        return self.resource is None or fnmatchcase(event.get('resource') or '', self.resource)
+
+
+def event_state(event):
+    if event['event'] == 'running':
+        return 'up' if event['running'] else 'down'
+    if event['event'] == 'resource' and event.get('state') is None:
+        return 'removed'
+    return event.get(HOOK_EVENTS[event['event']])
+
+
+class HookRunner:
+    """
+    Engine listener that runs the matching ``hooks`` on ``workers`` threads, without ever blocking the caller.
+
+    At most ``max_queued`` runs wait at a time; Beyond that new runs are dropped (back-pressure). A hook already waiting
+    to run for the same resource is not queued again: its waiting run will see the latest event (runs are deduplicated
+    per hook and resource, so one resource's event never replaces another's).
+    Each run is killed after its hook's ``timeout``.
+    """
+    def __init__(self, hooks, log, workers=2, max_queued=32, count=None):
+        self.hooks = hooks
+        self._log = log
+        self.workers = workers
+        self._count = count  # optional function(result): 'ok', 'failed', 'timeout', 'deduplicated' or 'dropped'
+        self._queue = queue.Queue(max_queued)
+        self._waiting = {}  # (hook index, resource or None) -> latest event, while the run is queued
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopped = False
+
+    def __call__(self, event):
+        for i, hook in enumerate(self.hooks):
+            if hook.matches(event):
+                self.submit(i, event)
+
+    def _counted(self, result):
+        if self._count is not None:
+            self._count(result)
+
+    def submit(self, index, event):
+        with self._lock:
+            if self._stopped:
+                return
+            key = (index, event.get('resource'))
+            if key in self._waiting:
+                self._waiting[key] = event
+                self._counted('deduplicated')
+                return
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self._log(f'Hook "{self.hooks[index].name}" dropped; {self._queue.maxsize} runs are already waiting', 'WARN')
+                self._counted('dropped')
+                return
+            self._waiting[key] = event
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'tilt-hook-{len(self._threads)}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _work(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            with self._lock:
+                event = self._waiting.pop(key, None)  # None if `shutdown()` discarded it meanwhile
+                if event is None or self._stopped:
+                    continue
+            hook = self.hooks[key[0]]
+            start = time.monotonic()
+            try:
+                self._run(hook, event)
+                result = 'ok'
+            except subprocess.TimeoutExpired:
+                self._log(f'Hook "{hook.name}" timed out after {hook.timeout} seconds', 'WARN')
+                result = 'timeout'
+            except Exception as hook_err:
+                self._log(f'Hook "{hook.name}" failed: {hook_err}', 'WARN')
+                result = 'failed'
+            else:
+                self._log(f'Hook "{hook.name}" done in {time.monotonic() - start:.1f} seconds')
+            self._counted(result)
+
+    @staticmethod
+    def _run(hook, event):
+        payload = json.dumps(event, default=str)
+        if hook.url:
+            request = urllib.request.Request(hook.url, data=payload.encode('utf-8'), headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=hook.timeout) as response:
+                    response.read()
+            except (socket.timeout, TimeoutError):  # distinct classes before Python 3.10
+                raise subprocess.TimeoutExpired(hook.url, hook.timeout) from None
+            except urllib.error.URLError as url_err:  # e.g. a timeout while connecting
+                if isinstance(url_err.reason, (socket.timeout, TimeoutError)):
+                    raise subprocess.TimeoutExpired(hook.url, hook.timeout) from None
+                raise
+            return
+        env = dict(os.environ, TILT_EVENT=event['event'], TILT_STATE=str(event_state(event)), TILT_RESOURCE=event.get('resource') or '')
+        process = subprocess.Popen(hook.command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   text=True, env=env, start_new_session=True)
+        try:
+            _, stderr = process.communicate(payload, timeout=hook.timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)  # the command's whole process group, not just the shell
+            process.wait()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(f'exit code {process.returncode}' + (f': {stderr.strip()[-500:]}' if stderr.strip() else ''))
+
+    def shutdown(self):
+        """Stop the workers once the running hooks are done; Waiting runs are discarded"""
+        with self._lock:
+            self._stopped = True
+            self._waiting.clear()
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in self._threads:
+                self._queue.put_nowait(None)
@@ -0,0 +1,84 @@
+"""Menu bar icon manager: cached status images, change-only updates and rendered count badges (macOS only)"""
+from collections import OrderedDict
+
+from AppKit import (
+    NSAttributedString, NSBezierPath, NSColor, NSCompositingOperationSourceOver, NSFont, NSFontAttributeName,
+    NSForegroundColorAttributeName, NSImage, NSMakeRect, NSZeroRect,
+)
+
+
+ICON_SIZE = (20, 20)  # same as rumps uses for icons loaded from file
+BADGE_CACHE_SIZE = 32
+
+
+class IconManager:
+    """
+    Sets the status bar image of a ``rumps.App``.
+
+    Each asset file is loaded once; ``set()`` only touches the status item when the (icon, badge) pair differs from the
+    current one, and badge variants are rendered once and kept in a bounded LRU cache.
+    """
+    def __init__(self, rumps_app, icon_paths, cache_size=BADGE_CACHE_SIZE):
+        self.app = rumps_app
+        self.icon_paths = icon_paths  # {name: file path}
+        self.cache_size = cache_size
+        self.current = None
+        self._images = {}
+        self._badges = OrderedDict()
+
+    def set(self, name, badge=None):
+        """Show icon ``name`` (a key of ``icon_paths``), with an optional count ``badge`` (hidden for 0/None)"""
+        key = (name, badge or None)
+        if key == self.current:
+            return False
+        image = self._image(name) if key[1] is None else self._badge_image(name, key[1])
+        self.app._icon = self.icon_paths[name]
+        self.app._icon_nsimage = image
+        try:
+            self.app._nsapp.setStatusBarIcon()
+        except AttributeError:
+            pass  # app not running yet; rumps applies _icon_nsimage when it creates the status item
+        self.current = key
+        return True
+
+    def _image(self, name):
+        image = self._images.get(name)
+        if image is None:
+            image = NSImage.alloc().initWithContentsOfFile_(self.icon_paths[name])
+            image.setScalesWhenResized_(True)
+            image.setSize_(ICON_SIZE)
+            self._images[name] = image
+        return image
+
+    def _badge_image(self, name, count):
+        key = (name, count)
+        image = self._badges.get(key)
+        if image is not None:
+            self._badges.move_to_end(key)
+            return image
+        image = self._badges[key] = render_badge(self._image(name), count)
+        if len(self._badges) > self.cache_size:
+            self._badges.popitem(last=False)
+        return image
+
+
+def render_badge(base, count):
+    """Draw ``base`` with a red rounded count badge in its bottom-right corner"""
+    width, height = ICON_SIZE
+    image = NSImage.alloc().initWithSize_(ICON_SIZE)
+    image.lockFocus()
+    try:
+        base.drawInRect_fromRect_operation_fraction_(NSMakeRect(0, 0, width, height), NSZeroRect, NSCompositingOperationSourceOver, 1.0)
+        text = NSAttributedString.alloc().initWithString_attributes_(str(count) if count < 100 else '99+', {
+            NSFontAttributeName: NSFont.boldSystemFontOfSize_(height * 0.4),
+            NSForegroundColorAttributeName: NSColor.whiteColor(),
+        })
+        text_width, text_height = text.size()
+        badge_width = max(text_width + 4, text_height)
+        badge_rect = NSMakeRect(width - badge_width, 0, badge_width, text_height)
+        NSColor.systemRedColor().set()
+        NSBezierPath.bezierPathWithRoundedRect_xRadius_yRadius_(badge_rect, text_height / 2, text_height / 2).fill()
+        text.drawAtPoint_((width - badge_width + (badge_width - text_width) / 2, 0))
+    finally:
+        image.unlockFocus()
+    return image
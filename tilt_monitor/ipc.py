@@ -0,0 +1,163 @@
+"""
+Unix domain socket serving the running monitor's cached snapshot (stdlib only).
+
+Protocol: one JSON object per line in each direction. Requests:
+    {"request": "status"}                       -> full snapshot, including all resources
+    {"request": "summary"}                      -> aggregate state and state counts
+    {"request": "resource", "name": "<name>"}   -> a single resource
+    {"request": "subscribe"}                    -> the full snapshot now, then again on every change (until disconnect),
+                                                   and {"ok": true, "heartbeat": true} after a quiet SUBSCRIBE_HEARTBEAT
+Every response has ``ok`` (bool), and ``error`` (str) when ``ok`` is false.
+"""
+import itertools
+import json
+import os
+import socket
+import socketserver
+import threading
+
+
+SUBSCRIBE_HEARTBEAT = 30  # seconds without a change before a heartbeat line is sent (a write detects a gone subscriber)
+
+
+def snapshot_to_dict(snapshot, include_resources=True):
+    result = {
+        'ok': True,
+        'generation': snapshot['generation'],
+        'timestamp': snapshot['timestamp'],
+        'running': snapshot['running'],
+        'healthy': snapshot['healthy'],
+        'stale': snapshot['stale'],
+        'state_counts': snapshot['state_counts'],
+    }
+    if include_resources:
+        result['resources'] = [resource.as_dict() for resource in snapshot['resources']]
+        result['disabled'] = [resource.as_dict() for resource in snapshot['disabled']]
+    return result
+
+
+class SnapshotServer:
+    """Serves ``get_snapshot()`` over a Unix socket at ``path``; Call ``publish()`` whenever the snapshot changes"""
+    def __init__(self, path, get_snapshot, format_summary, log):
+        self.path = path
+        self.get_snapshot = get_snapshot
+        self.format_summary = format_summary
+        self._log = log
+        self._changed = threading.Condition()
+        self._server = None
+
+    def publish(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait_for_change(self, generation, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self.get_snapshot()['generation'] != generation, timeout)
+        return self.get_snapshot()
+
+    def handle(self, request):
+        snapshot = self.get_snapshot()
+        kind = request.get('request')
+        if kind == 'status':
+            return snapshot_to_dict(snapshot)
+        if kind == 'summary':
+            result = snapshot_to_dict(snapshot, include_resources=False)
+            result['summary'] = self.format_summary(snapshot['state_counts']) if snapshot['state_counts'] else ''
+            return result
+        if kind == 'resource':
+            name = request.get('name')
+            for resource in itertools.chain(snapshot['resources'], snapshot['disabled']):
+                if resource.name == name:
+                    result = snapshot_to_dict(snapshot, include_resources=False)
+                    result['resource'] = resource.as_dict()
+                    return result
+            return {'ok': False, 'error': f'Resource not found: {name}'}
+        return {'ok': False, 'error': f'Unknown request: {kind}'}
+
+    def _is_in_use(self):
+        """Check whether another process is already listening on ``path`` (otherwise it is a stale socket file)"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.path)
+                return True
+            except OSError:
+                return False
+
+    def start(self):
+        if os.path.exists(self.path):
+            if self._is_in_use():
+                raise RuntimeError(f'Socket {self.path} is in use by another monitor')
+            os.remove(self.path)
+
+        owner = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        self._send({'ok': False, 'error': 'Invalid JSON request'})
+                        continue
+                    if not isinstance(request, dict):
+                        self._send({'ok': False, 'error': 'Request must be a JSON object'})
+                        continue
+                    if request.get('request') == 'subscribe':
+                        self._subscribe()
+                        return
+                    self._send(owner.handle(request))
+
+            def _send(self, response):
+                self.wfile.write(json.dumps(response, separators=(',', ':')).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+            def _subscribe(self):
+                snapshot = owner.get_snapshot()
+                try:
+                    self._send(snapshot_to_dict(snapshot))
+                    while True:
+                        generation = snapshot['generation']
+                        snapshot = owner.wait_for_change(generation, SUBSCRIBE_HEARTBEAT)
+                        if snapshot['generation'] != generation:
+                            self._send(snapshot_to_dict(snapshot))
+                        elif owner._server is None:
+                            return  # server stopped
+                        else:
+                            self._send({'ok': True, 'heartbeat': True})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # subscriber went away
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, _Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+        threading.Thread(target=self._server.serve_forever, name='ipc-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            server, self._server = self._server, None
+            server.shutdown()
+            server.server_close()
+            self.publish()  # release waiting subscribers
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def query_monitor(path, request, timeout=2):
+    """
+    Send a single request to the monitor listening on ``path``.
+    :return: The decoded response, or None if no monitor is listening (or its response is not valid JSON)
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as f:
+                line = f.readline()
+    except OSError:
+        return None
+    try:
+        return json.loads(line) if line else None
+    except ValueError:
+        return None  # truncated, e.g. the monitor exited while writing
@@ -0,0 +1,96 @@
+"""Label -> resources index, maintained incrementally across snapshots (stdlib only)"""
+
+
+STATE_SEVERITY = {'error': 3, 'unknown': 2, 'pending': 1, 'ok': 0, 'disabled': -1}  # a group is as bad as its worst resource
+NO_LABEL = 'unlabeled'
+TILTFILE_LABEL = 'Tiltfile'
+
+
+def label_sort_key(label):
+    """Labels A->Z, then unlabeled resources, then the Tiltfile (same order as ``get_tilt_status``)"""
+    return label == TILTFILE_LABEL, label == NO_LABEL, label
+
+
+class LabelIndex:
+    """
+    Maps each label to the resources that carry it; A resource may carry any number of labels.
+
+    ``update()`` takes the full resource list of a snapshot, but only touches the entries of resources whose labels or
+    state changed, so membership lookups (``names()``) are O(1) and group states are recomputed only for the groups that
+    changed.
+    """
+    def __init__(self):
+        self.generation = 0
+        self._labels = {}  # resource name -> tuple of labels
+        self._states = {}  # resource name -> state
+        self._members = {}  # label -> {resource name: None} (an ordered set)
+        self._group_states = {}  # label -> aggregate state, None if stale
+
+    def update(self, resources):
+        """
+        :param resources: Iterable of ``(name, labels, state)``; Resources missing from it are dropped from the index
+        :return: True if any membership or state changed
+        """
+        seen = set()
+        changed = False
+        for name, labels, state in resources:
+            seen.add(name)
+            prv_labels = self._labels.get(name)
+            if prv_labels != labels:
+                for label in prv_labels or ():
+                    self._discard(label, name)
+                for label in labels:
+                    self._members.setdefault(label, {})[name] = None
+                    self._group_states[label] = None
+                self._labels[name] = labels
+                changed = True
+            if self._states.get(name) != state:
+                self._states[name] = state
+                for label in labels:
+                    self._group_states[label] = None
+                changed = True
+        for name in self._labels.keys() - seen:
+            for label in self._labels.pop(name):
+                self._discard(label, name)
+            del self._states[name]
+            changed = True
+        if changed:
+            self.generation += 1
+        return changed
+
+    def _discard(self, label, name):
+        members = self._members.get(label)
+        if members is None:
+            return
+        members.pop(name, None)
+        if members:
+            self._group_states[label] = None
+        else:
+            del self._members[label]
+            self._group_states.pop(label, None)
+
+    def labels(self):
+        """All labels, in menu order"""
+        return sorted(self._members, key=label_sort_key)
+
+    def names(self, label):
+        """Names of the resources with ``label`` (a set-like view; empty for an unknown label)"""
+        return self._members.get(label, {}).keys()
+
+    def select(self, labels):
+        """Names of the resources with any of ``labels``"""
+        selected = set()
+        for label in labels:
+            selected.update(self.names(label))
+        return selected
+
+    def state(self, name):
+        return self._states.get(name)
+
+    def group_state(self, label):
+        """The worst state among the resources with ``label``"""
+        state = self._group_states.get(label)
+        if state is None and label in self._members:
+            state = max((self._states[name] for name in self._members[label]), key=STATE_SEVERITY.__getitem__)
+            self._group_states[label] = state
+        return state
@@ -0,0 +1,76 @@
+"""Incremental log tails of failing Tilt resources, following the view's log checkpoints (stdlib only)"""
+from collections import deque
+
+
+BACKFILL_SEGMENTS = 2000  # how far back (in log segments) the tail of a newly failing resource is looked for
+
+
+class LogTailer:
+    """
+    Keeps the last ``max_lines`` log lines of each failing resource.
+
+    ``fetch(from_checkpoint)`` must return a Tilt view dict with a ``logList`` (``spans``, ``segments``, ``fromCheckpoint``,
+    ``toCheckpoint``). The tailer asks only for segments after its cursor, and skips any it has already seen, so it stays
+    correct whether or not the server trims the response. Nothing is fetched while no resource is failing; when a resource
+    starts failing, the next fetch starts up to ``BACKFILL_SEGMENTS`` before the cursor to backfill its tail (only the
+    new resources take lines from before the cursor).
+    """
+    def __init__(self, fetch, max_lines=20):
+        self.fetch = fetch
+        self.max_lines = max_lines
+        self.checkpoint = 0
+        self.tails = {}  # resource name -> deque of lines
+        self._line_open = {}  # resource name -> True if its last line did not end with a newline yet
+
+    def update(self, failing):
+        """
+        Refresh the tails of the ``failing`` resource names.
+        :return: True if any tail changed (or was dropped)
+        """
+        changed = False
+        for name in list(self.tails):
+            if name not in failing:
+                del self.tails[name]
+                self._line_open.pop(name, None)
+                changed = True
+        if not failing or not self.max_lines:
+            return changed
+
+        new_names = failing - self.tails.keys()
+        for name in new_names:
+            self.tails[name] = deque(maxlen=self.max_lines)
+            self._line_open[name] = False
+        start = max(0, self.checkpoint - BACKFILL_SEGMENTS) if new_names else self.checkpoint
+
+        log_list = self.fetch(start).get('logList') or {}
+        spans = log_list.get('spans') or {}
+        segments = log_list.get('segments') or []
+        from_checkpoint = log_list.get('fromCheckpoint') or 0
+        to_checkpoint = log_list.get('toCheckpoint', from_checkpoint + len(segments))
+        if to_checkpoint < self.checkpoint:
+            # Log was reset (e.g. Tilt restarted); start over
+            self.checkpoint = 0
+            for name in failing:
+                self.tails[name].clear()
+                self._line_open[name] = False
+            self.update(failing)
+            return True
+
+        first = max(start, from_checkpoint)
+        for checkpoint, segment in enumerate(segments[first - from_checkpoint:], first):
+            name = (spans.get(segment.get('spanId')) or {}).get('manifestName')
+            if name in failing and (checkpoint >= self.checkpoint or name in new_names):
+                self._append(name, segment.get('text', ''))
+                changed = True
+        self.checkpoint = max(self.checkpoint, to_checkpoint)
+        return changed or bool(new_names)
+
+    def _append(self, name, text):
+        tail = self.tails[name]
+        lines = text.split('\n')
+        if self._line_open[name] and tail:
+            tail[-1] += lines.pop(0)
+        self._line_open[name] = not text.endswith('\n')
+        if not self._line_open[name]:
+            lines.pop()  # empty string after the trailing newline
+        tail.extend(line.rstrip('\r') for line in lines)
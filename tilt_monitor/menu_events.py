@@ -0,0 +1,34 @@
+"""Open/close notifications of a rumps app's menu, through an NSMenu delegate (macOS only)"""
+from Foundation import NSObject
+import objc
+
+
+class MenuEventsDelegate(NSObject):
+    """
+    Calls ``on_open()`` right before the menu is shown (where it may still be changed), and ``on_close()`` after it
+    closes. NSMenu keeps only a weak reference to its delegate, so the owner must keep this object alive.
+    """
+    def initWithOpen_close_(self, on_open, on_close):
+        self = objc.super(MenuEventsDelegate, self).init()
+        if self is None:
+            return None
+        self.on_open = on_open
+        self.on_close = on_close
+        return self
+
+    def menuNeedsUpdate_(self, menu):
+        self.on_open()
+
+    def menuDidClose_(self, menu):
+        self.on_close()
+
+
+def attach_menu_events(rumps_app, on_open, on_close):
+    """Attach a ``MenuEventsDelegate`` to the app's menu; Returns it (to be kept referenced), or None if not possible"""
+    try:
+        ns_menu = rumps_app._menu._menu
+    except AttributeError:
+        return None
+    delegate = MenuEventsDelegate.alloc().initWithOpen_close_(on_open, on_close)
+    ns_menu.setDelegate_(delegate)
+    return delegate
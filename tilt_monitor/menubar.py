@@ -0,0 +1,525 @@
+"""macOS menu bar front end (rumps) for the Tilt monitoring engine"""
+import glob
+import os
+import rumps
+import shutil
+import subprocess
+import sys
+import time
+import webbrowser
+
+from tilt_monitor.breaker import CLOSED
+from tilt_monitor.engine import MonitorEngine
+from tilt_monitor.icons import IconManager
+from tilt_monitor.menu_events import attach_menu_events
+from tilt_monitor.perf import format_summary
+from tilt_monitor.resources import STATE_ERROR
+from tilt_monitor.tilt_monitor import (
+    app, api_breaker, config, log, load_config, perf, profiler, tilt_processes, check_interval, format_state_summary, stop_services, record_launch_time, run_in_background,
+    is_tiltfile_path_valid, is_app_location_valid, APP_NAME, APP_VERSION, APP_DESCRIPTION, APP_URL, bundle_path, config_file, log_file,
+    perf_stats_file, tmp_file_pfx, default_icon, gray_icon, green_icon, red_icon, transparent_icon, PERF_DUMP_INTERVAL, QUIT_TIMEOUT,
+)
+
+
+MENU_OPT_STATUS_SUMMARY = 'Status Summary'
+MENU_OPT_OPEN_UI = 'Open Tilt UI'
+MENU_OPT_TILT_UP = 'Tilt Up'
+MENU_OPT_TILT_STARTING = 'Tilt Starting...'
+MENU_OPT_TILT_DOWN = 'Tilt Down'
+MENU_OPT_TILT_STOPPING = 'Tilt Stopping...'
+MENU_OPT_CHECKING = 'Checking Tilt...'
+MENU_OPT_STALE = '⏳ Last known status (checking...)'
+MENU_OPT_EDIT_CONFIG = 'Edit Configuration'
+MENU_OPT_RELOAD = 'Reload'
+MENU_OPT_SHOW_LOG = 'Show Log'
+MENU_OPT_PERF_STATS = 'Performance Stats'
+MENU_OPT_START_PROFILING = 'Start Profiling'
+MENU_OPT_STOP_PROFILING = 'Stop Profiling'
+MENU_OPT_ABOUT = f'About {APP_NAME}'
+MENU_OPT_API_NOT_RESPONDING = '⚠️ Tilt API not responding'
+MENU_OPT_TRIGGER_ERRORED = 'Trigger Errored Resources'
+MENU_GROUP_ACTIONS = (('trigger', 'Trigger All'), ('enable', 'Enable All'), ('disable', 'Disable All'))  # per label group
+MENU_LOG_LINE_WIDTH = 120  # log tail lines are truncated to this many characters
+STATE_ICONS = {'ok': '🟢', 'pending': '⚪️', 'error': '🔴', 'unknown': '🟡', 'disabled': '⚫️'}
+INIT_DELAY = 0.1  # seconds from starting the event loop (i.e. the icon is shown) to `initialize`
+
+
+def rumps_alert(title, message, ok='OK', other=None, cancel=None, callback=None):
+    if not hasattr(sys, 'frozen') and not sys.argv[0].endswith('.app/Contents/MacOS/'):
+        return 0
+    return rumps.alert(title, message, ok, other, cancel, callback)
+
+
+def move_to_applications():
+    """Move the app bundle to the Applications folder. NOTE: Must be run only after TiltMonitorApp was initialized to use rump commands"""
+    app_name = os.path.basename(bundle_path)
+    destination_path = os.path.join('/Applications', app_name)
+    dest_exists = os.path.exists(destination_path)
+
+    alert_msg = (f'To keep your applications organized, it is recommended to move {APP_NAME} to your Applications folder.\n\n'
+                 f'Would you like to move it now{" (overwrite the existing version)" if dest_exists else ""} and relaunch?')
+    response = rumps_alert(title=f'Move {APP_NAME}?', message=alert_msg, ok='Move to Applications', cancel="Don't Move")
+    if response == 1:  # OK button
+        try:
+            if dest_exists:
+                log(f'Removing existing destination: {destination_path}')
+                shutil.rmtree(destination_path)
+            log(f'Moving {bundle_path} to {destination_path}')
+            shutil.move(bundle_path, destination_path)
+            log('Relaunching from new location')
+            subprocess.Popen(['open', destination_path])
+            rumps.quit_application()
+        except Exception as mv_err:
+            log(f'Failed to move application: {mv_err}', 'ERROR', mv_err)
+            alert_msg = f'Could not move {APP_NAME} to the Applications folder.\n\nPlease do it manually.'
+            rumps_alert(title='Move Failed', message=alert_msg, ok='OK')
+
+
+def rumps_notification(subtitle, message):
+    """
+    :param title: The notification title (required)
+    :param subtitle: The notification subtitle (optional)
+    :param message: The notification message/body (optional)
+    :param data: Custom data to be passed to callback (optional)
+    :param sound: Boolean to enable/disable sound (default True)
+    :param icon: Path to icon image (optional)
+    :param action_button: Text for the action button (optional)
+    :param other_button: Text for the other button (optional)
+    :param callback: Function to call when notification is clicked (optional)
+    :return:
+    """
+    try:
+        rumps.notification(APP_NAME, subtitle, message)
+    except RuntimeError:
+        log(f'Notification not shown:\n\t{subtitle}\n\t{message}', 'WARN')
+
+
+class TiltMonitorApp(rumps.App):
+    """macOS Menu Bar App for monitoring Tilt"""
+    # ToDo - implement check for updates
+    def __init__(self, short_timer_interval=None, long_timer_interval=None, up_on_start=False):
+        super().__init__(APP_NAME, icon=default_icon)
+
+        self.title = ''  # must remain empty, otherwise the renderer attempts to show the title instead of the icon
+        self.icons = IconManager(self, {'gray': gray_icon, 'green': green_icon, 'red': red_icon, 'transparent': transparent_icon})
+        self.engine = MonitorEngine(short_timer_interval, long_timer_interval)
+        self.short_timer = rumps.Timer(self.check_tilt, self.engine.short_interval)
+        self.long_timer = rumps.Timer(self.check_tilt, self.engine.long_interval)
+        self.up_on_start = up_on_start
+        self.show_reload_option = False
+        self.perf_dumped_at = 0.0
+        self.quitting = False
+        self.stopping_title = None
+        self.first_tick = None
+        self.first_poll = None
+        self.menu = []
+        # The menu is only (re)built when it is opened, or while it is open; Its detail sections (label groups and failing
+        # resources) are cached until the status they show changes
+        self.menu_open = False
+        self.menu_dirty = True
+        self.logs_generation = 0
+        self._details_key = None
+        self._details = []
+        self.menu_events = attach_menu_events(self, self.menu_will_open, self.menu_did_close)
+        # Provisional icon and menu until the first status check is done: the restored last known status (see
+        # `restore_snapshot`), or gray and 'Checking Tilt...'
+        if app.snapshot['stale']:
+            self.set_icon(app.tilt_running, app.tilt_healthy)
+        else:
+            self.icons.set('gray')
+        self.update_menu_visibility()
+        # Initial check on delayed timer to allow the app to run
+        self.init_timer = rumps.Timer(self.initialize, INIT_DELAY)
+        self.init_timer.start()
+
+    def initialize(self, _):
+        self.init_timer.stop()
+        record_launch_time('first_icon')
+        if not is_app_location_valid():
+            move_to_applications()
+
+        # The first status request runs off the main thread, so the menu responds meanwhile; Only the request: the app
+        # state (snapshot, label index) is updated by `poll_first_status`, on the main thread like every other tick
+        self.first_tick = run_in_background(self._first_poll, 'first-status')
+        self.first_status_timer = rumps.Timer(self.poll_first_status, INIT_DELAY)
+        self.first_status_timer.start()
+
+    def _first_poll(self):
+        self.first_poll = self.engine.poll()
+
+    def poll_first_status(self, _):
+        if self.first_tick.is_alive():
+            return
+        self.first_status_timer.stop()
+        # Starts the timer matching the running state, if it changed; Polls again if Tilt Up was clicked meanwhile
+        self._check_tilt(None if self.engine.tilt_starting else self.first_poll)
+        self.first_poll = None
+        self.update_menu_visibility()  # no longer provisional
+        record_launch_time('first_status')
+        if not self.short_timer.is_alive() and not self.long_timer.is_alive():  # same state as restored, or the check failed
+            if app.tilt_running:
+                self.activate_short_timer()
+            else:
+                self.activate_long_timer()
+        if not app.tilt_running and self.up_on_start and not self.engine.tilt_starting:
+            self.tilt_up(None)
+
+    def cleanup_and_quit(self, _):
+        for f in glob.glob(f'{tmp_file_pfx}*'):
+            if os.path.isfile(f):
+                log(f'Removing temp file: {f}')
+                os.remove(f)
+        log('Closing application')
+        self.quitting = True
+        self.tilt_down(None)
+        self.quit_deadline = time.monotonic() + QUIT_TIMEOUT
+        self.quit_timer = rumps.Timer(self.poll_quit, 0.5)
+        self.quit_timer.start()
+
+    def poll_quit(self, _):
+        if tilt_processes.busy and time.monotonic() < self.quit_deadline:
+            return  # still stopping Tilt
+        if tilt_processes.busy:
+            log(f'Tilt did not stop within {QUIT_TIMEOUT} seconds; Quitting anyway', 'WARN')
+        self.quit_timer.stop()
+        stop_services()
+        rumps.quit_application()
+
+    def activate_short_timer(self):
+        """Check at ``engine.interval``: every second while a Tilt startup is profiled, the short interval otherwise"""
+        self.long_timer.stop()
+        if self.short_timer.interval != self.engine.interval:
+            self.short_timer.stop()  # a running NSTimer keeps the interval it was started with
+            self.short_timer.interval = self.engine.interval
+        self.short_timer.start()
+        check_interval.set(self.short_timer.interval)
+        log(f'Set health check timer to {self.short_timer.interval} seconds')
+
+    def activate_long_timer(self):
+        self.short_timer.stop()
+        self.long_timer.start()
+        check_interval.set(self.long_timer.interval)
+        log(f'Set health check timer to {self.long_timer.interval} seconds')
+
+    def check_tilt(self, _):
+        with profiler.sample('check_tilt'), perf.timer('tick'):
+            self._check_tilt()
+        self.dump_perf_stats()
+
+    def dump_perf_stats(self, force=False):
+        if not perf.enabled:
+            return
+        now = time.monotonic()
+        if force or now - self.perf_dumped_at >= PERF_DUMP_INTERVAL:
+            self.perf_dumped_at = now
+            try:
+                perf.dump(perf_stats_file)
+            except Exception as dump_err:
+                log(f'Error writing performance stats: {dump_err}', 'ERROR', dump_err)
+
+    def _check_tilt(self, polled=None):
+        if tilt_processes.busy:
+            return  # Tilt is being stopped; the state will be refreshed when it is done
+        try:
+            result = self.engine.tick(polled)
+        except Exception as tick_err:
+            result = tick_err
+        self._apply_result(result)
+
+    def _apply_result(self, result):
+        """Show the result of ``MonitorEngine.tick()`` (or the exception it raised): icon, menu and timer"""
+        try:
+            if isinstance(result, Exception):
+                raise result
+            with perf.timer('icon'):
+                self.set_icon(result['running'], result['healthy'], result['error'])
+            if result['logs_changed']:
+                self.logs_generation += 1
+            for batch in result['actions']:
+                rumps_notification(f'{batch.action.capitalize()} finished', batch.summary())
+            if result['started'] or result['groups_changed'] or result['logs_changed'] or result['circuit_changed']:
+                self.update_menu_visibility()
+
+            if result['running_changed']:
+                self.update_menu_visibility()
+                if app.tilt_running:
+                    self.activate_short_timer()
+                else:
+                    self.activate_long_timer()
+            elif app.tilt_running and self.short_timer.interval != self.engine.interval:
+                self.activate_short_timer()  # startup profiling started or finished
+        except Exception as tilt_err:
+            self.icons.set('gray')
+            log(f'{tilt_err}', 'ERROR', tilt_err)
+            self.update_menu_visibility()
+
+    def set_icon(self, running, healthy, error=None):
+        if not running:
+            self.icons.set('transparent')
+        elif healthy is False:
+            error_count = app.snapshot['state_counts'].get('error') if config.icon_badge and not error else None
+            self.icons.set('red', error_count)
+        else:
+            self.icons.set('green' if healthy else 'gray')
+
+    @rumps.clicked(MENU_OPT_EDIT_CONFIG)
+    def edit_config(self, _):
+        """Open configuration file in default editor"""
+        try:
+            if not os.path.exists(config_file):
+                load_config()
+            log(f'Edit configuration file: {config_file}')
+            subprocess.call(['open', config_file])
+            self.show_reload_option = True
+            self.update_menu_visibility()
+            rumps_notification('Edit Configuration', "Click 'Reload' from the app menu when done to apply changes")
+        except Exception as edit_err:
+            log(f'Error opening config file: {edit_err}', 'ERROR', edit_err)
+            rumps_alert('Error', f'Could not open configuration file: {edit_err}')
+
+    def about(self, _):
+        """Show the About window"""
+        log('Showing About message window')
+        about_msg = f'Version {APP_VERSION}\n\n{APP_DESCRIPTION}'
+        clicked = rumps_alert(
+            title=APP_NAME,
+            message=about_msg,
+            ok='Close',  # 1
+            other='View on GitHub',  # 0
+            # cancel = 'Cancel',  # -1
+        )
+        log(f'Button clicked: {clicked}')
+        if clicked == 0:
+            log('Opening GitHub page')
+            webbrowser.open(APP_URL)
+
+    def reload_app(self, _):
+        """Reload the application"""
+        log('Reloading application')
+        args = [arg for arg in sys.argv if arg != '--reloaded']
+        stop_services()  # execv skips atexit and daemon threads: flush the history, and free the IPC socket for the new process
+        os.execv(sys.executable, [sys.executable] + args + ['--reloaded'])
+
+    @rumps.clicked(MENU_OPT_SHOW_LOG)
+    def show_log(self, _):
+        """Open the log file in the default editor"""
+        try:
+            subprocess.call(['open', log_file])
+        except Exception as show_err:
+            log(f'Error opening log file: {show_err}', 'ERROR', show_err)
+            rumps_alert('Error', f'Could not open log file: {show_err}. Please check the log file manually ({log_file}).')
+
+    def show_perf_stats(self, _):
+        """Show rolling percentiles of the status check pipeline stages"""
+        stages = perf.summary()
+        self.dump_perf_stats(force=True)
+        message = format_summary(stages) if stages else 'No samples recorded yet'
+        log(f'Performance stats:\n{message}')
+        rumps_alert(title=MENU_OPT_PERF_STATS, message=message)
+
+    def toggle_profiling(self, _):
+        """Start profiling, or stop it and show where the dumps are"""
+        if not profiler.active:
+            profiler.start()
+            rumps_notification('Profiling Started', f'Dumps are written to {profiler.out_dir} every {profiler.dump_interval // 60} minutes')
+        else:
+            paths = profiler.stop()
+            rumps_notification('Profiling Stopped', f'Last dump: {", ".join(os.path.basename(path) for path in paths)}')
+            subprocess.call(['open', profiler.out_dir])
+        self.update_menu_visibility()
+
+    @rumps.clicked(MENU_OPT_OPEN_UI)
+    def open_ui(self, _):
+        webbrowser.open(config.ui_url)
+
+    @rumps.clicked(MENU_OPT_TILT_UP)
+    def tilt_up(self, _):
+        if not is_tiltfile_path_valid(config.tilt_file_dir):
+            log("Cannot 'tilt up': 'tilt_file_path' is not configured or is invalid.", 'WARN')
+            rumps_notification(
+                'Configuration Required',
+                "Click on 'Edit Configuration' and set 'tilt_file_path' to a valid Tiltfile path"
+            )
+            return
+
+        if self.engine.tilt_up():
+            self.update_menu_visibility()  # Update menu to show "starting" status
+            self.poll_timer = rumps.Timer(self.poll_tilt_started, 1)  # Start a polling timer to check when Tilt is available
+            self.poll_timer.start()
+            # rumps_notification('Tilt Up', 'Tilt has been started')
+
+    def poll_tilt_started(self, _):
+        with profiler.sample('poll_tilt_started'):
+            self._poll_tilt_started()
+
+    def _poll_tilt_started(self):
+        if self.engine.poll_started():
+            self.poll_timer.stop()
+            self.activate_short_timer()
+            self.update_menu_visibility()
+
+    @rumps.clicked(MENU_OPT_TILT_DOWN)
+    def tilt_down(self, _):
+        if self.engine.tilt_starting and hasattr(self, 'poll_timer') and self.poll_timer.is_alive():
+            self.poll_timer.stop()
+
+        if not self.engine.tilt_down():
+            return  # Already stopping, or failed to stop Tilt
+
+        self.stop_timer = rumps.Timer(self.poll_tilt_stopped, 1)  # Reflect stop progress in the menu until done
+        self.stop_timer.start()
+        self.activate_long_timer()
+        self.icons.set('transparent')
+        self.update_menu_visibility()
+        # rumps_notification('Tilt Down', 'Tilt has been stopped')
+
+    def poll_tilt_stopped(self, _):
+        if tilt_processes.busy:
+            if self.stopping_title != tilt_processes.status:
+                self.update_menu_visibility()
+            return
+        self.stop_timer.stop()
+        log('Tilt stopped')
+        if not self.quitting:
+            self.update_menu_visibility()
+
+    def run_action(self, action, names):
+        """Run a bulk resource action in the background; A notification reports the results when it is done"""
+        names = sorted(names)
+        if not names:
+            return
+        self.engine.run_action(action, names)
+        rumps_notification(f'{action.capitalize()} started', f'{len(names)} resources: {", ".join(names)}')
+
+    def trigger_errored(self, _):
+        self.run_action('trigger', [r.name for r in app.snapshot['resources'] if r.state == STATE_ERROR])
+
+    def _detail_items(self):
+        """The label group and failing resource items (with their submenus), rebuilt only when their content changed"""
+        key = (app.snapshot['generation'], app.label_index.generation, self.logs_generation)
+        if key != self._details_key:
+            with perf.timer('menu_details'):
+                self._details = []
+                self._add_label_groups(self._details)
+                self._add_failing_resources(self._details)
+            self._details_key = key
+        return self._details
+
+    def _add_label_groups(self, items):
+        """Add a submenu per label, titled with the group's worst state, listing its resources"""
+        index = app.label_index
+        labels = index.labels()
+        if not labels:
+            return
+        items.append(None)  # separator
+        for label in labels:
+            names = sorted(index.names(label))
+            group_item = rumps.MenuItem(f'{STATE_ICONS[index.group_state(label)]} {label} ({len(names)})')
+            for r_name in names:
+                group_item.add(rumps.MenuItem(f'{STATE_ICONS[index.state(r_name)]} {r_name}',
+                                              callback=lambda _, name=r_name: webbrowser.open(config.resource_ui_url(name))))
+            group_item.add(None)  # separator
+            disabled = [name for name in names if index.state(name) == 'disabled']
+            enabled = [name for name in names if index.state(name) != 'disabled']
+            for action, title in MENU_GROUP_ACTIONS:
+                targets = disabled if action == 'enable' else enabled  # only enable the disabled ones, and so on
+                if targets:
+                    group_item.add(rumps.MenuItem(title, callback=lambda _, action=action, names=targets: self.run_action(action, names)))
+            items.append(group_item)
+
+    def _add_failing_resources(self, items):
+        """Add an item per failing resource (opens it in the Tilt UI), with the tail of its log as a submenu"""
+        tails = self.engine.log_tailer.tails
+        if not tails:
+            return
+        items.append(None)  # separator
+        for r_name in sorted(tails):
+            resource_item = rumps.MenuItem(f'🔴 {r_name}', callback=lambda _, name=r_name: webbrowser.open(config.resource_ui_url(name)))
+            for line in tails[r_name] or ['(no log lines yet)']:
+                text = line if len(line) <= MENU_LOG_LINE_WIDTH else line[:MENU_LOG_LINE_WIDTH - 1] + '…'
+                resource_item.add(rumps.MenuItem(text or ' '))
+            items.append(resource_item)
+
+    def menu_will_open(self):
+        self.menu_open = True
+        if self.menu_dirty:
+            with profiler.sample('update_menu_visibility'), perf.timer('menu'):
+                self._update_menu_visibility()
+
+    def menu_did_close(self):
+        self.menu_open = False
+
+    def update_menu_visibility(self):
+        if self.menu_events is not None and not self.menu_open:
+            self.menu_dirty = True  # nobody sees it; rebuilt when opened (see `menu_will_open`)
+            return
+        with profiler.sample('update_menu_visibility'), perf.timer('menu'):
+            self._update_menu_visibility()
+
+    def _update_menu_visibility(self):
+        """Update menu items based on Tilt status"""
+        is_running = app.tilt_running
+        self.menu_dirty = False
+
+        self.menu.clear()
+        # ToDo - improve the logic of adding and removing menu items
+        # Add items based on current state
+        if app.snapshot['stale']:
+            self.menu.add(rumps.MenuItem(MENU_OPT_STALE))  # disabled; until the first status check replaces the restored status
+        if tilt_processes.busy:
+            self.stopping_title = tilt_processes.status
+            self.menu.add(rumps.MenuItem(self.stopping_title or MENU_OPT_TILT_STOPPING))
+        elif self.engine.tilt_starting:
+            self.menu.add(MENU_OPT_TILT_STARTING)
+            self.menu.add(MENU_OPT_TILT_DOWN)
+            self.menu[MENU_OPT_TILT_DOWN].set_callback(self.tilt_down)
+            if is_running:
+                self.menu.add(MENU_OPT_OPEN_UI)
+                self.menu[MENU_OPT_OPEN_UI].set_callback(self.open_ui)
+        elif is_running is None:
+            self.menu.add(rumps.MenuItem(MENU_OPT_CHECKING))  # disabled; replaced once the first status check is done
+            self.menu.add(MENU_OPT_EDIT_CONFIG)
+            self.menu[MENU_OPT_EDIT_CONFIG].set_callback(self.edit_config)
+        elif is_running:
+            if api_breaker.state != CLOSED:
+                self.menu.add(rumps.MenuItem(MENU_OPT_API_NOT_RESPONDING))  # disabled; probed at a reduced rate
+            state_summary = format_state_summary(app.snapshot['state_counts'])
+            if state_summary:
+                self.menu.add(rumps.MenuItem(state_summary))  # disabled
+                self.menu.add(None)  # separator
+            self.menu.add(MENU_OPT_OPEN_UI)
+            self.menu[MENU_OPT_OPEN_UI].set_callback(self.open_ui)
+            self.menu.add(MENU_OPT_TILT_DOWN)
+            self.menu[MENU_OPT_TILT_DOWN].set_callback(self.tilt_down)
+            if app.snapshot['state_counts'].get('error'):
+                self.menu.add(MENU_OPT_TRIGGER_ERRORED)
+                self.menu[MENU_OPT_TRIGGER_ERRORED].set_callback(self.trigger_errored)
+            for item in self._detail_items():
+                self.menu.add(item)
+        else:
+            self.menu.add(MENU_OPT_TILT_UP)
+            if is_tiltfile_path_valid(config.tilt_file_dir):
+                self.menu[MENU_OPT_TILT_UP].set_callback(self.tilt_up)
+            else:
+                self.menu[MENU_OPT_TILT_UP].set_callback(None)
+
+            self.menu.add(MENU_OPT_EDIT_CONFIG)
+            self.menu[MENU_OPT_EDIT_CONFIG].set_callback(self.edit_config)
+
+            if self.show_reload_option:
+                self.menu.add(MENU_OPT_RELOAD)
+                self.menu[MENU_OPT_RELOAD].set_callback(self.reload_app)
+        # Always shown:
+        self.menu.add(None)  # separator
+        self.menu.add(MENU_OPT_SHOW_LOG)
+        self.menu[MENU_OPT_SHOW_LOG].set_callback(self.show_log)
+        if perf.enabled:
+            self.menu.add(MENU_OPT_PERF_STATS)
+            self.menu[MENU_OPT_PERF_STATS].set_callback(self.show_perf_stats)
+        profiling_title = MENU_OPT_STOP_PROFILING if profiler.active else MENU_OPT_START_PROFILING
+        self.menu.add(rumps.MenuItem(profiling_title, callback=self.toggle_profiling))
+        self.menu.add(None)  # separator
+        self.menu.add(MENU_OPT_ABOUT)
+        self.menu[MENU_OPT_ABOUT].set_callback(self.about)
+        quit_item = rumps.MenuItem('Quit', callback=self.cleanup_and_quit)
+        self.menu.add(quit_item)
@@ -0,0 +1,196 @@
+"""Minimal OpenMetrics registry and local HTTP exposition endpoint (stdlib only)"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def format_family(name, metric_type, documentation, samples, unit=''):
+    """
+    Format a single metric family as OpenMetrics text lines.
+    :param samples: Iterable of ``(suffix, labels, value)``, where ``labels`` is a sequence of ``(key, value)`` pairs
+    """
+    lines = [f'# TYPE {name} {metric_type}']
+    if unit:
+        lines.append(f'# UNIT {name} {unit}')
+    lines.append(f'# HELP {name} {_escape(documentation)}')
+    for suffix, labels, value in samples:
+        lines.append(f'{name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+    return lines
+
+
+class _Metric:
+    metric_type = 'unknown'
+
+    def __init__(self, name, documentation, unit=''):
+        self.name = name
+        self.documentation = documentation
+        self.unit = unit
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        with self._lock:
+            samples = list(self.samples())
+        return format_family(self.name, self.metric_type, self.documentation, samples, self.unit)
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        return [('_total', key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        return [('', key, value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, unit='', buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, unit)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (last one is +Inf), sum]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        result = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = '+Inf' if math.isinf(bound) else repr(float(bound))
+                result.append(('_bucket', key + (('le', le),), cumulative))
+            result.append(('_count', key, cumulative))
+            result.append(('_sum', key, total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Holds the monitor's own metrics and any number of collectors.
+
+    Collectors are callables returning a list of already formatted OpenMetrics lines, and are evaluated on each scrape;
+    They must only read cached state, never call the Tilt API.
+    """
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, unit=''):
+        return self._register(Counter(name, documentation, unit))
+
+    def gauge(self, name, documentation, unit=''):
+        return self._register(Gauge(name, documentation, unit))
+
+    def histogram(self, name, documentation, unit='', buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, unit, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves ``registry.render()`` on ``http://<host>:<port>/metrics`` from a daemon thread"""
+    def __init__(self, registry, port, host='127.0.0.1'):
+        self.registry = registry
+        self.address = (host, port)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass  # keep scrapes out of the app log
+
+        self._server = ThreadingHTTPServer(self.address, _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,106 @@
+"""Low-overhead hot-path timers with rolling percentiles (stdlib only)"""
+from collections import deque
+import json
+import os
+import time
+
+
+class _NullTimer:
+    """Shared no-op context manager returned while stats are disabled (and while profiling is off)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()  # also returned by `Profiler.sample` while profiling is off
+
+
+class _Timer:
+    __slots__ = ('_samples', '_start')
+
+    def __init__(self, samples):
+        self._samples = samples
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._samples.append(time.perf_counter() - self._start)
+        return False
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class PerfStats:
+    """
+    Named stage timers keeping the last ``window`` samples of each stage.
+
+    Usage::
+
+        with perf.timer('download'):
+            ...
+
+    When disabled, ``timer()`` returns a shared no-op context manager and nothing is recorded.
+    """
+    def __init__(self, enabled=True, window=500):
+        self.enabled = enabled
+        self.window = window
+        self._samples = {}
+        self._order = []
+
+    def _stage(self, name):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+            self._order.append(name)
+        return samples
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self._stage(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self._stage(name).append(seconds)
+
+    def summary(self):
+        """Return ``{stage: {count, p50, p90, p99, max}}`` in milliseconds, in first-recorded order"""
+        result = {}
+        for name in self._order:
+            values = sorted(self._samples[name])
+            result[name] = {
+                'count': len(values),
+                'p50': percentile(values, 50) * 1000,
+                'p90': percentile(values, 90) * 1000,
+                'p99': percentile(values, 99) * 1000,
+                'max': (values[-1] if values else 0.0) * 1000,
+            }
+        return result
+
+    def dump(self, path):
+        """Atomically write the summary as JSON, to be read by other processes (e.g. `tilt-status --stats`)"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': time.time(), 'window': self.window, 'stages': self.summary()}, f)
+        os.replace(tmp_path, path)
+
+
+def format_summary(stages):
+    """Format a ``PerfStats.summary()`` dict as a fixed-width text table"""
+    name_width = max([len('Stage')] + [len(name) for name in stages])
+    lines = [f'{"Stage".ljust(name_width)}  {"Count":>6}  {"p50 ms":>8}  {"p90 ms":>8}  {"p99 ms":>8}  {"max ms":>8}']
+    for name, s in stages.items():
+        lines.append(f'{name.ljust(name_width)}  {s["count"]:>6}  {s["p50"]:>8.2f}  {s["p90"]:>8.2f}  {s["p99"]:>8.2f}  {s["max"]:>8.2f}')
+    return '\n'.join(lines)
@@ -0,0 +1,111 @@
+"""Process-group aware management of the `tilt up` / `tilt down` processes"""
+import os
+import signal
+import subprocess
+import threading
+
+
+class TiltProcessManager:
+    """
+    Starts `tilt up` in its own process group, and stops Tilt in the background.
+
+    Every started process is reaped by a daemon thread, so it never lingers as a zombie. Its output goes to
+    ``output_file`` (overwritten on every start), or is discarded without one; It is never piped, as nothing reads it.
+    Stopping never blocks the caller: poll ``busy`` (and ``status`` for progress text) or call ``wait()`` with a timeout.
+    """
+    def __init__(self, log, term_timeout=10, down_timeout=120, output_file=None):
+        self._log = log
+        self.output_file = output_file
+        self.term_timeout = term_timeout  # seconds between SIGTERM and SIGKILL
+        self.down_timeout = down_timeout  # seconds before a hanging `tilt down` is killed
+        self.process = None
+        self.status = None
+        self._stopper = None
+
+    @property
+    def busy(self):
+        return self._stopper is not None and self._stopper.is_alive()
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, cmd, cwd, env):
+        """Start ``cmd`` as the leader of a new process group (so signals reach every child Tilt spawns)"""
+        output = open(self.output_file, 'w') if self.output_file else subprocess.DEVNULL
+        try:
+            process = subprocess.Popen(cmd, cwd=cwd, stdout=output, stderr=subprocess.STDOUT, env=env, start_new_session=True)
+        finally:
+            if output is not subprocess.DEVNULL:
+                output.close()  # the child has its own copy
+        self.process = process
+        threading.Thread(target=self._reap, args=(process,), name=f'reap-{process.pid}', daemon=True).start()
+        return process
+
+    def stop(self, down_cmd, cwd, env):
+        """
+        Stop Tilt in a background thread.
+        If this manager owns a live `tilt up` process, its process group is terminated; Otherwise ``down_cmd`` is run.
+        :return: False if a stop is already in progress
+        """
+        if self.busy:
+            return False
+        self._stopper = threading.Thread(target=self._stop, args=(down_cmd, cwd, env), name='tilt-stop', daemon=True)
+        self._stopper.start()
+        return True
+
+    def wait(self, timeout=None):
+        """Wait for an in-progress stop; Returns True if nothing is left running"""
+        if self._stopper is not None:
+            self._stopper.join(timeout)
+        return not self.busy
+
+    def _reap(self, process):
+        return_code = process.wait()
+        self._log(f'Tilt process {process.pid} exited with code {return_code}')
+
+    def _stop(self, down_cmd, cwd, env):
+        try:
+            if self.is_alive():
+                self._terminate_group(self.process)
+            else:
+                self._run_down(down_cmd, cwd, env)
+        except Exception as stop_err:
+            self._log(f'Error stopping Tilt: {stop_err}', 'ERROR', stop_err)
+        finally:
+            self.process = None
+            self.status = None
+
+    def _signal_group(self, process, sig):
+        try:
+            os.killpg(process.pid, sig)  # pgid == pid, since the process was started with start_new_session
+            return True
+        except ProcessLookupError:
+            return False  # already gone
+
+    def _terminate_group(self, process):
+        self.status = 'Stopping Tilt...'
+        if not self._signal_group(process, signal.SIGTERM):
+            return
+        self._log(f'Sent SIGTERM to Tilt process group {process.pid}')
+        try:
+            process.wait(self.term_timeout)
+        except subprocess.TimeoutExpired:
+            self.status = 'Killing Tilt...'
+            self._log(f'Tilt process group {process.pid} did not exit within {self.term_timeout} seconds; Sending SIGKILL', 'WARN')
+            self._signal_group(process, signal.SIGKILL)
+            process.wait()
+        self._log(f'Terminated Tilt process {process.pid}')
+
+    def _run_down(self, cmd, cwd, env):
+        self.status = 'Running tilt down...'
+        self._log(f'Running command: {" ".join(cmd)}')
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env,
+                                   start_new_session=True)
+        try:
+            output, _ = process.communicate(timeout=self.down_timeout)
+        except subprocess.TimeoutExpired:
+            self._log(f'`tilt down` did not finish within {self.down_timeout} seconds; Killing it', 'WARN')
+            self._signal_group(process, signal.SIGKILL)
+            output, _ = process.communicate()
+        log_lvl = 'INFO' if process.returncode == 0 else 'ERROR'
+        self._log(f'`tilt down` exited with code {process.returncode}' + (f':\n{output.strip()}' if output and output.strip() else ''), log_lvl)
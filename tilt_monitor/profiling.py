@@ -0,0 +1,160 @@
+"""Opt-in profiling mode: sampled cProfile of the timer callbacks, and periodic tracemalloc snapshots (stdlib only)"""
+import cProfile
+from datetime import datetime
+import glob
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+from tilt_monitor.perf import NULL_TIMER
+
+
+class _Sample:
+    __slots__ = ('_profiler', '_name', '_profiled')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+        self._profiled = False
+
+    def __enter__(self):
+        profiler = self._profiler
+        profiler.calls[self._name] = profiler.calls.get(self._name, 0) + 1
+        profiler._depth += 1
+        if profiler._depth == 1:  # only outermost callbacks are sampled; nested ones are part of their profile
+            if profiler._outer_calls % profiler.sample_every == 0:
+                self._profiled = True
+                profiler._profile.enable()
+            profiler._outer_calls += 1
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self._profiler
+        if self._profiled:
+            profiler._profile.disable()
+        profiler._depth -= 1
+        if not profiler._depth:
+            profiler.maybe_dump()
+        return False
+
+
+class Profiler:
+    """
+    Samples every ``sample_every``-th timer callback with cProfile, and every ``dump_interval`` seconds writes to
+    ``out_dir``:
+
+    - ``profile-<ts>.pstats``: the accumulated cProfile stats (e.g. for ``snakeviz`` or ``pstats``)
+    - ``profile-<ts>.txt``: the top ``top`` functions by cumulative time
+    - ``tracemalloc-<ts>.txt``: the top ``top`` allocation sites, and their growth since the previous dump
+
+    Usage (a no-op while profiling is off)::
+
+        with profiler.sample('check_tilt'):
+            ...
+    """
+    def __init__(self, out_dir, log, sample_every=5, dump_interval=300, top=25, keep=20, frames=5):
+        self.out_dir = out_dir
+        self._log = log
+        self.sample_every = sample_every
+        self.dump_interval = dump_interval
+        self.top = top
+        self.keep = keep  # number of dumps kept (of each kind)
+        self.frames = frames  # traceback depth of tracemalloc
+        self.active = False
+        self._profile = None
+        self.calls = {}  # callback name -> number of calls since profiling started
+        self._outer_calls = 0
+        self._depth = 0
+        self._dumped_at = 0.0
+        self._snapshot = None
+        self._tracing = False  # whether tracemalloc was started here (not e.g. with PYTHONTRACEMALLOC)
+
+    def sample(self, name):
+        if not self.active:
+            return NULL_TIMER  # the same shared no-op as disabled perf stats
+        return _Sample(self, name)
+
+    def start(self):
+        if self.active:
+            return
+        self._profile = cProfile.Profile()
+        self.calls = {}
+        self._outer_calls = 0
+        self._snapshot = None
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start(self.frames)
+        self._dumped_at = time.monotonic()
+        self.active = True
+        self._log(f'Profiling started (1 in {self.sample_every} timer callbacks; dumps to {self.out_dir} every {self.dump_interval} seconds)')
+        self.dump()  # the baseline for the allocation growth
+
+    def stop(self):
+        """Write a last dump, and stop tracing allocations; Returns the dump paths"""
+        if not self.active:
+            return []
+        paths = self.dump()
+        self.active = False
+        self._profile = None
+        self._snapshot = None
+        if self._tracing:
+            tracemalloc.stop()
+        self._log('Profiling stopped')
+        return paths
+
+    def maybe_dump(self):
+        if time.monotonic() - self._dumped_at >= self.dump_interval:
+            self.dump()
+
+    def dump(self):
+        self._dumped_at = time.monotonic()
+        ts = datetime.now().strftime('%Y%m%d-%H%M%S')
+        os.makedirs(self.out_dir, exist_ok=True)
+        paths = []
+        try:
+            if self._outer_calls:
+                paths += self._dump_profile(ts)
+            paths.append(self._dump_allocations(ts))
+        except Exception as dump_err:
+            self._log(f'Error writing profiling dump: {dump_err}', 'ERROR', dump_err)
+        for pattern in ('profile-*.pstats', 'profile-*.txt', 'tracemalloc-*.txt'):
+            for old_path in sorted(glob.glob(os.path.join(self.out_dir, pattern)))[:-self.keep]:
+                os.remove(old_path)
+        if paths:
+            self._log('Profiling dump: ' + ', '.join(os.path.basename(path) for path in paths))
+        return paths
+
+    def _dump_profile(self, ts):
+        pstats_path = os.path.join(self.out_dir, f'profile-{ts}.pstats')
+        text_path = os.path.join(self.out_dir, f'profile-{ts}.txt')
+        self._profile.dump_stats(pstats_path)
+        text = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=text)
+        text.write(f'Timer callbacks: {", ".join(f"{name} x{count}" for name, count in self.calls.items())}; '
+                   f'1 in {self.sample_every} profiled\n')
+        stats.sort_stats('cumulative').print_stats(self.top)
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+        return [pstats_path, text_path]
+
+    def _dump_allocations(self, ts):
+        path = os.path.join(self.out_dir, f'tracemalloc-{ts}.txt')
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f'Traced memory: {current / 1024:.0f} KiB (peak {peak / 1024:.0f} KiB)', '']
+        if self._snapshot is not None:
+            lines.append(f'Top {self.top} allocation growth since the previous dump:')
+            lines += [str(stat) for stat in snapshot.compare_to(self._snapshot, 'lineno')[:self.top]]
+            lines.append('')
+        lines.append(f'Top {self.top} allocation sites:')
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:self.top]]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        self._snapshot = snapshot
+        return path
@@ -0,0 +1,97 @@
+"""
+Tiny fixed-format status file for shell prompts.
+
+The monitor rewrites the file (atomically) only when its snapshot changes; Readers only parse a single line,
+so this module must stay free of third-party imports (see `tilt-status --prompt`).
+
+Format (one line, space separated): ``v1 <state> <ok> <pending> <error> <warn> <generation> <pid> <timestamp>``,
+where ``state`` is one of ``ok``, ``error``, ``pending`` or ``down``.
+"""
+import os
+import sys
+
+from tilt_monitor import __app_name__
+
+
+FORMAT_VERSION = 'v1'
+FIELDS = ('state', 'ok', 'pending', 'error', 'warn', 'generation', 'pid', 'timestamp')
+PROMPT_FILE_NAME = 'prompt_status'
+DEFAULT_FORMAT = '{state}'
+
+
+def default_prompt_file():
+    """Same location as ``config_dir`` of the monitor, computed without importing it"""
+    return os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', __app_name__.replace(' ', ''), PROMPT_FILE_NAME)
+
+
+def snapshot_state(snapshot):
+    if not snapshot['running']:
+        return 'down'
+    return {True: 'ok', False: 'error'}.get(snapshot['healthy'], 'pending')
+
+
+def write_prompt_status(path, snapshot):
+    counts = snapshot['state_counts']
+    line = ' '.join(str(v) for v in (
+        FORMAT_VERSION, snapshot_state(snapshot), counts.get('ok', 0), counts.get('pending', 0), counts.get('error', 0),
+        counts.get('warn', 0), snapshot['generation'], os.getpid(), int(snapshot['timestamp'] or 0),
+    ))
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(line + '\n')
+    os.replace(tmp_path, path)
+
+
+def read_prompt_status(path=None):
+    """Return the status fields as a dict, or None if there is no file, it is malformed, or its writer is gone"""
+    try:
+        with open(path or default_prompt_file(), 'r', encoding='utf-8') as f:
+            parts = f.readline().split()
+    except OSError:
+        return None
+    if len(parts) != len(FIELDS) + 1 or parts[0] != FORMAT_VERSION:
+        return None
+    status = dict(zip(FIELDS, parts[1:]))
+    try:
+        os.kill(int(status['pid']), 0)  # the monitor that wrote the file must still be running
+    except PermissionError:
+        pass  # running, as another user
+    except (OSError, ValueError):
+        return None
+    for key in FIELDS[1:]:
+        status[key] = int(status[key])
+    status['total'] = status['ok'] + status['pending'] + status['error'] + status['warn']
+    return status
+
+
+def format_prompt(status, fmt=DEFAULT_FORMAT):
+    """Format the status with ``str.format`` placeholders: any of ``FIELDS``, plus ``total``"""
+    return fmt.format(**status)
+
+
+def print_prompt_status(fmt=DEFAULT_FORMAT):
+    """Print the formatted status (nothing if no monitor is running); Returns the exit code (2 for an invalid format)"""
+    status = read_prompt_status()
+    if status is None:
+        return 1
+    try:
+        line = format_prompt(status, fmt)
+    except (KeyError, IndexError, AttributeError, ValueError) as fmt_err:
+        fields = ', '.join(FIELDS + ('total',))
+        print(f'tilt-status: invalid prompt format {fmt!r} ({type(fmt_err).__name__}: {fmt_err}); Fields: {fields}', file=sys.stderr)
+        return 2
+    print(line)
+    return 0
+
+
+def main():
+    """
+    `tilt-status` entry point.
+    Serves ``--prompt [FORMAT]`` before anything else is imported, and delegates everything else to ``tilt_status.main``.
+    """
+    args = sys.argv[1:]
+    if args and args[0] == '--prompt' and len(args) <= 2:
+        sys.exit(print_prompt_status(args[1] if len(args) == 2 else DEFAULT_FORMAT))
+
+    from tilt_monitor.tilt_status import main as tilt_status_main
+    tilt_status_main()
@@ -0,0 +1,212 @@
+"""
+Record and replay Tilt `/api/view` traffic, to profile and regression-test the monitor offline.
+
+Recordings are gzipped NDJSON: a header line, then one frame per response that differs from the previous one::
+
+    {"format": "tilt-monitor-recording", "version": 1, "url": "...", "started": <epoch seconds>}
+    {"t": <seconds since start>, "status": <HTTP status, 0 if unreachable>, "ms": <response time>, "body": "<raw JSON>"}
+
+Usage::
+
+    python -m tilt_monitor.replay record -o view.ndjson.gz [--interval 1] [--duration 600]
+    python -m tilt_monitor.replay serve view.ndjson.gz [--port 10350] [--speed 10] [--loop] [--latency]
+    python -m tilt_monitor.replay bench view.ndjson.gz
+
+``serve`` answers `/api/view` with the frame that was current at the same (scaled) point in time, so the monitor can
+run against it with ``--base-url``; ``bench`` feeds every frame through the status pipeline and prints its timings.
+"""
+import argparse
+from bisect import bisect_right
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import sys
+import threading
+import time
+
+
+RECORDING_FORMAT = 'tilt-monitor-recording'
+RECORDING_VERSION = 1
+DEFAULT_URL = 'http://localhost:10350'
+
+
+class Recording:
+    """The frames of a recording file, with their offsets (seconds since the recording started)"""
+    def __init__(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.header = json.loads(f.readline())
+            if self.header.get('format') != RECORDING_FORMAT or self.header.get('version') != RECORDING_VERSION:
+                raise ValueError(f'{path} is not a version {RECORDING_VERSION} Tilt Monitor recording')
+            self.frames = [json.loads(line) for line in f if line.strip()]
+        if not self.frames:
+            raise ValueError(f'{path} has no recorded frames')
+        self.offsets = [frame['t'] for frame in self.frames]
+        self.duration = self.offsets[-1]
+
+    def frame_at(self, offset):
+        """The frame that was current ``offset`` seconds into the recording"""
+        return self.frames[max(0, bisect_right(self.offsets, offset) - 1)]
+
+
+def record(path, url=DEFAULT_URL, interval=1.0, duration=None, out=sys.stderr):
+    """Poll ``url`` every ``interval`` seconds and append each changed response to ``path``, until Ctrl+C or ``duration``"""
+    import requests  # recording only
+
+    status_url = f'{url.rstrip("/")}/api/view?log=true'  # with the logs, so a replay also feeds the log tails
+    started = time.time()
+    start = time.monotonic()
+    frames = 0
+    prv_key = None
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'format': RECORDING_FORMAT, 'version': RECORDING_VERSION, 'url': url, 'started': started}) + '\n')
+        try:
+            while duration is None or time.monotonic() - start < duration:
+                tick = time.monotonic()
+                try:
+                    res = requests.get(status_url, timeout=max(interval, 5))
+                    status, body = res.status_code, res.text
+                except requests.RequestException:
+                    status, body = 0, ''
+                elapsed_ms = round((time.monotonic() - tick) * 1000, 1)
+                if (status, body) != prv_key:
+                    prv_key = (status, body)
+                    f.write(json.dumps({'t': round(tick - start, 3), 'status': status, 'ms': elapsed_ms, 'body': body}) + '\n')
+                    frames += 1
+                    out.write(f'\r{frames} frames, {tick - start:.0f}s')
+                time.sleep(max(0.0, interval - (time.monotonic() - tick)))
+        except KeyboardInterrupt:
+            pass
+    out.write(f'\nRecorded {frames} frames to {path}\n')
+    return frames
+
+
+class ReplayServer:
+    """Serves a ``Recording`` as the Tilt API on ``http://<host>:<port>/api/view``, from a daemon thread"""
+    def __init__(self, recording, port=10350, host='127.0.0.1', speed=1.0, loop=False, latency=False):
+        self.recording = recording
+        self.address = (host, port)
+        self.speed = speed
+        self.loop = loop
+        self.latency = latency  # also replay the recorded response times
+        self.started = None
+        self._server = None
+
+    def current_frame(self):
+        offset = (time.monotonic() - self.started) * self.speed
+        if self.loop and self.recording.duration > 0:
+            offset %= self.recording.duration
+        return self.recording.frame_at(offset)
+
+    @property
+    def finished(self):
+        return not self.loop and (time.monotonic() - self.started) * self.speed > self.recording.duration
+
+    def start(self):
+        owner = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/api/view':
+                    self.send_error(404)
+                    return
+                frame = owner.current_frame()
+                if owner.latency and frame.get('ms'):
+                    time.sleep(frame['ms'] / 1000 / owner.speed)
+                if not frame['status']:
+                    self.send_error(502, 'Tilt was unreachable at this point of the recording')
+                    return
+                body = frame['body'].encode('utf-8')
+                self.send_response(frame['status'])
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.started = time.monotonic()
+        self._server = ThreadingHTTPServer(self.address, _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def bench(recording, rounds=1):
+    """
+    Run every frame of ``recording`` through the status pipeline (filter, projection, health check, state counts and
+    snapshot), without any network I/O.
+    :return: The ``PerfStats`` summary, plus ``frames`` (classification per frame, for regression checks)
+    """
+    from tilt_monitor.tilt_monitor import (
+        config, perf, get_resource_labels, get_tilt_status, is_tilt_healthy, update_snapshot, app,
+    )
+    app.tilt_running = True
+    frames = []
+    for _ in range(rounds):
+        for frame in recording.frames:
+            if frame['status'] != 200:
+                continue
+            with perf.timer('decode'):
+                data = json.loads(frame['body'])
+            with perf.timer('filter'):
+                data['uiResources'] = config.resource_filter.apply(data.get('uiResources', []), get_resource_labels)
+            with perf.timer('tick'):
+                result_list = get_tilt_status(data)
+                with perf.timer('healthy'):
+                    healthy = is_tilt_healthy(result_list)
+                update_snapshot(result_list, healthy)
+            frames.append({'t': frame['t'], 'healthy': healthy, 'state_counts': app.snapshot['state_counts']})
+    return perf.summary(), frames[:len(frames) // rounds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay Tilt API traffic')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='Record /api/view responses of a running Tilt')
+    record_parser.add_argument('-o', '--output', required=True, help='Recording file (gzipped NDJSON)')
+    record_parser.add_argument('--url', default=DEFAULT_URL, help=f'Tilt base URL (default: {DEFAULT_URL})')
+    record_parser.add_argument('--interval', type=float, default=1.0, help='Seconds between requests (default: 1)')
+    record_parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds (default: Ctrl+C)')
+    serve_parser = commands.add_parser('serve', help='Serve a recording as the Tilt API')
+    serve_parser.add_argument('recording')
+    serve_parser.add_argument('--port', type=int, default=10350)
+    serve_parser.add_argument('--speed', type=float, default=1.0, help='Playback speed factor (default: 1)')
+    serve_parser.add_argument('--loop', action='store_true', help='Start over at the end of the recording')
+    serve_parser.add_argument('--latency', action='store_true', help='Also replay the recorded response times')
+    bench_parser = commands.add_parser('bench', help='Run a recording through the status pipeline and print its timings')
+    bench_parser.add_argument('recording')
+    bench_parser.add_argument('--rounds', type=int, default=1, help='Number of passes over the recording (default: 1)')
+    bench_parser.add_argument('--frames', action='store_true', help='Also print the classification of each frame (NDJSON)')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.output, args.url, args.interval, args.duration)
+    elif args.command == 'serve':
+        recording = Recording(args.recording)
+        server = ReplayServer(recording, args.port, speed=args.speed, loop=args.loop, latency=args.latency).start()
+        print(f'Replaying {len(recording.frames)} frames ({recording.duration:.0f}s at {args.speed}x) on '
+              f'http://{server.address[0]}:{args.port}/api/view; Ctrl+C to stop')
+        try:
+            while not server.finished:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        server.stop()
+    else:
+        from tilt_monitor.perf import format_summary
+        stages, frames = bench(Recording(args.recording), args.rounds)
+        if args.frames:
+            for frame in frames:
+                print(json.dumps(frame))
+        print(format_summary(stages))
+
+
+if __name__ == '__main__':
+    main()
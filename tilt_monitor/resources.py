@@ -0,0 +1,186 @@
+"""Compact Tilt resource records, reused across ticks while a resource does not change (stdlib only)"""
+import sys
+
+from tilt_monitor.labels import NO_LABEL, TILTFILE_LABEL, label_sort_key
+
+
+# Tilt update/runtime statuses, as small int codes; Values unknown to this version are appended on first sight
+STATUSES = ['none', 'pending', 'in_progress', 'ok', 'error', 'not_applicable']
+NONE, PENDING, IN_PROGRESS, OK, ERROR, NOT_APPLICABLE = range(6)
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Overall state of a resource (see `resource_state`); Disabled resources are never counted nor affect the health
+STATES = ('ok', 'pending', 'error', 'unknown', 'disabled')
+STATE_OK, STATE_PENDING, STATE_ERROR, STATE_UNKNOWN, STATE_DISABLED = range(5)
+
+COUNT_KEYS = ('ok', 'pending', 'error', 'warn')  # keys of the state counts (status summary, prompt, IPC)
+
+
+def status_code(status):
+    code = _STATUS_CODES.get(status)
+    if code is None:
+        status = sys.intern(status)
+        code = _STATUS_CODES[status] = len(STATUSES)
+        STATUSES.append(status)
+    return code
+
+
+def resource_state(update, runtime):
+    """State code of a resource from its update and runtime status codes"""
+    if update == ERROR or runtime == ERROR:
+        return STATE_ERROR
+    if update in (PENDING, IN_PROGRESS) or runtime in (PENDING, IN_PROGRESS):
+        return STATE_PENDING
+    if update in (OK, NOT_APPLICABLE) and runtime in (OK, NOT_APPLICABLE):
+        return STATE_OK
+    return STATE_UNKNOWN
+
+
+def count_key(update, runtime, warn):
+    """The state counts key of a resource (None if it is not counted)"""
+    if warn:
+        return 'warn'
+    if update == ERROR or runtime == ERROR:
+        return 'error'
+    if update in (PENDING, IN_PROGRESS) or runtime in (PENDING, IN_PROGRESS):
+        return 'pending'
+    if update == OK and runtime in (OK, NOT_APPLICABLE):
+        return 'ok'
+    return None
+
+
+def is_disabled(status):
+    disable = status.get('disableStatus')
+    return bool(disable) and disable.get('state') == 'Disabled'
+
+
+def get_resource_labels(meta):
+    """All labels of a resource (the first one is its primary label)"""
+    if meta.get('labels'):
+        return tuple(sys.intern(label) for label in meta['labels'].values())
+    return (TILTFILE_LABEL,) if meta['name'] == '(Tiltfile)' else (NO_LABEL,)
+
+
+class Resource:
+    """
+    One Tilt resource: interned ``name`` and ``labels``, and ``update``/``runtime``/``state`` codes.
+    Records are never modified; A changed resource gets a new record, so an unchanged one is the same object.
+    """
+    __slots__ = ('name', 'labels', 'update', 'runtime', 'warn', 'disabled', 'state', 'count_key', '_raw_labels')
+
+    def __init__(self, name, labels, update, runtime, warn=False, raw_labels=None, disabled=False):
+        self.name = name
+        self.labels = labels
+        self.update = update
+        self.runtime = runtime
+        self.warn = warn
+        self.disabled = disabled
+        self.state = STATE_DISABLED if disabled else resource_state(update, runtime)
+        self.count_key = None if disabled else count_key(update, runtime, warn)
+        self._raw_labels = raw_labels  # the API's labels, to tell whether they changed without building a tuple
+
+    @classmethod
+    def from_statuses(cls, label, name, update_status, runtime_status, labels=None, disabled=False):
+        return cls(sys.intern(name), labels or (sys.intern(label),), status_code(update_status), status_code(runtime_status),
+                   disabled=disabled)
+
+    @property
+    def label(self):
+        return self.labels[0]
+
+    @property
+    def update_status(self):
+        return STATUSES[self.update]
+
+    @property
+    def runtime_status(self):
+        return STATUSES[self.runtime]
+
+    @property
+    def state_name(self):
+        return STATES[self.state]
+
+    def as_dict(self):
+        return {'label': self.labels[0], 'labels': list(self.labels), 'name': self.name,
+                'update_status': STATUSES[self.update], 'runtime_status': STATUSES[self.runtime], 'state': STATES[self.state]}
+
+    def __repr__(self):
+        return f'Resource({self.name!r}, {self.labels!r}, {self.update_status}, {self.runtime_status})'
+
+
+class ResourceTable:
+    """
+    The latest ``Resource`` of every Tilt resource, keyed by name.
+
+    ``update()`` compares each API resource with its record in place, and only builds records (and re-sorts) for
+    resources that changed, so a steady-state tick allocates nothing but the decoded response.
+
+    Disabled resources are kept (so they can be enabled again), but never counted; With ``skip_disabled`` they are left
+    out of ``resources`` and listed in ``disabled`` instead.
+    """
+    def __init__(self, skip_disabled=True):
+        self.skip_disabled = skip_disabled
+        self.records = {}
+        self.resources = []  # records with an update status other than 'none' (or disabled), in `label_sort_key` order
+        self.disabled = []  # disabled records left out of `resources` (with `skip_disabled`), in the same order
+        self.state_counts = dict.fromkeys(COUNT_KEYS, 0)  # replaced (never modified) when it changes
+        self.generation = 0
+
+    def update(self, ui_resources):
+        """:return: True if any resource was added, changed or removed"""
+        records = self.records
+        changed = False
+        for r in ui_resources:
+            meta = r['metadata']
+            status = r.get('status') or {}
+            record = records.get(meta['name'])
+            update = _STATUS_CODES.get(status.get('updateStatus', 'none'))
+            runtime = _STATUS_CODES.get(status.get('runtimeStatus', 'none'))
+            warn = bool(status.get('warningCount')) or bool(status.get('warnings'))
+            disabled = is_disabled(status)
+            if record is not None and record.update == update and record.runtime == runtime and record.warn == warn \
+                    and record.disabled == disabled and record._raw_labels == meta.get('labels'):
+                continue
+            name = record.name if record is not None else sys.intern(meta['name'])
+            records[name] = Resource(name, get_resource_labels(meta), status_code(status.get('updateStatus', 'none')),
+                                     status_code(status.get('runtimeStatus', 'none')), warn, meta.get('labels'), disabled)
+            changed = True
+        if len(records) != len(ui_resources):  # some resources are gone
+            names = {r['metadata']['name'] for r in ui_resources}
+            for name in [name for name in records if name not in names]:
+                del records[name]
+            changed = True
+        if changed:
+            self._rebuild()
+        return changed
+
+    def _rebuild(self):
+        self.generation += 1
+        listed = sorted((r for r in self.records.values() if r.update != NONE or r.disabled), key=lambda r: label_sort_key(r.labels[0]))
+        if self.skip_disabled:
+            self.resources = [r for r in listed if not r.disabled]
+            self.disabled = [r for r in listed if r.disabled]
+        else:
+            self.resources = listed
+        state_counts = dict.fromkeys(COUNT_KEYS, 0)
+        for record in self.records.values():
+            if record.count_key:
+                state_counts[record.count_key] += 1
+        self.state_counts = state_counts
+
+    def dump(self):
+        """All records as compact rows: ``[name, API labels (dict or None), update status, runtime status, warn, disabled]``"""
+        return [[r.name, r._raw_labels, STATUSES[r.update], STATUSES[r.runtime], r.warn, r.disabled] for r in self.records.values()]
+
+    def restore(self, rows):
+        """
+        Replace the records with ``dump()`` rows (e.g. of a previous run); The next ``update()`` then only rebuilds the
+        records of resources that changed since.
+        """
+        records = {}
+        for name, raw_labels, update_status, runtime_status, warn, disabled in rows:
+            name = sys.intern(name)
+            records[name] = Resource(name, get_resource_labels({'name': name, 'labels': raw_labels}), status_code(update_status),
+                                     status_code(runtime_status), bool(warn), raw_labels, bool(disabled))
+        self.records = records
+        self._rebuild()
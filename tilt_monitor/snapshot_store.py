@@ -0,0 +1,40 @@
+"""
+Last-known status snapshot, persisted for a warm start after a reload or relaunch (stdlib only).
+
+The file is a single compact JSON object, rewritten (atomically) whenever the snapshot changes::
+
+    {"v": 2, "generation": 12, "timestamp": <epoch seconds>, "running": true, "healthy": false,
+     "resources": [[name, labels, update status, runtime status, warn, disabled], ...]}
+
+where ``v`` is ``SNAPSHOT_VERSION`` and ``resources`` are the rows of ``ResourceTable.dump()``. Files of another version
+are ignored.
+"""
+import json
+import os
+
+
+SNAPSHOT_VERSION = 2
+
+
+def write_snapshot(path, snapshot, rows):
+    """:param rows: ``ResourceTable.dump()`` (all resources, including those the snapshot leaves out)"""
+    data = {'v': SNAPSHOT_VERSION, 'generation': snapshot['generation'], 'timestamp': snapshot['timestamp'],
+            'running': snapshot['running'], 'healthy': snapshot['healthy'], 'resources': rows}
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """Return the saved snapshot dict, or None if there is none, it is malformed, or of another version"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('v') != SNAPSHOT_VERSION:
+        return None
+    if not isinstance(data.get('resources'), list) or not all(isinstance(row, list) and len(row) == 6 for row in data['resources']):
+        return None
+    return data
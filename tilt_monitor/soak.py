@@ -0,0 +1,363 @@
+"""
+Soak test: hours of monitoring in accelerated time against a synthetic Tilt API, checking that memory and CPU per tick
+stay flat.
+
+The stub serves ``resources`` resources that change state, get replaced by new ones (new names and labels) and write
+logs (capped at ``log_segments`` segments, like Tilt's own log store). Tilt is stopped for ``down_minutes`` every
+``cycle_minutes`` through the engine's own Tilt Down / Tilt Up (a stand-in `tilt` command is started and terminated by
+the process manager, and every startup is profiled); The stub's port refuses connections while it is down, and its
+resources start pending again when it is back. Ticks run back to back; Each one advances the stub's clock by the
+engine's current interval.
+
+Every ``sample_minutes`` (simulated) the RSS, the number of live objects (after a full GC) and the latency and CPU time
+of the ticks since the previous sample are recorded. After ``warmup_minutes``, the medians of the first and of the last
+``compare_samples`` samples are compared; The test fails if they grew beyond the ``--max-*-growth`` limits (percent).
+
+Usage::
+
+    python -m tilt_monitor.soak [--hours 4] [--resources 40] [--seed 1] [--report soak.json]
+
+The engine is run with hooks off, and with the status history (and any startup report) written to a temporary directory
+rather than the app's config directory; The menu bar front end (rumps timers and menu rebuilds) is not part of it.
+"""
+import argparse
+from collections import Counter
+import gc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import resource as os_resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+STATUSES = {  # state -> (update status, runtime status) choices
+    'ok': (('ok', 'ok'), ('ok', 'not_applicable')),
+    'pending': (('in_progress', 'pending'), ('pending', 'pending')),
+    'error': (('error', 'error'), ('ok', 'error'), ('error', 'not_applicable')),
+}
+STATE_WEIGHTS = {'ok': 6, 'pending': 2, 'error': 2}
+# Stand-in for the `tilt` command: `tilt up` runs until its process group is terminated, anything else exits at once
+FAKE_TILT = '''#!{python}
+import sys, time
+if sys.argv[1:2] == ['up']:
+    while True:
+        time.sleep(60)
+'''
+
+
+class SoakStub:
+    """
+    A synthetic Tilt API on ``http://127.0.0.1:<port>/api/view`` (served from daemon threads), driven by ``advance()``.
+    :param churn: State changes per resource per (simulated) hour
+    :param replace: Resources replaced by new ones per hour
+    :param log_rate: Log lines written per second (by random resources, and by every failing one)
+    :param start_seconds: Range of the seconds a resource stays pending after a (re)start before it is ok
+    """
+    def __init__(self, resources=40, churn=2.0, replace=6.0, log_rate=2.0, log_segments=2000, seed=1, port=0,
+                 start_seconds=(10.0, 120.0)):
+        self.random = random.Random(seed)
+        self.churn = churn
+        self.replace = replace
+        self.log_rate = log_rate
+        self.log_segments = log_segments
+        self.port = port
+        self.start_seconds = start_seconds
+        self.running = False
+        self.now = 0.0  # simulated seconds
+        self.resources = {}  # name -> [labels, update status, runtime status]
+        self.segments = []  # (span id, text)
+        self.checkpoint = 0  # of ``segments[0]``
+        self._next_id = 0
+        self._replace_due = 0.0
+        self._log_due = 0.0
+        self._ready_at = {}  # name -> simulated time a starting resource becomes ok
+        self._lock = threading.Lock()
+        self._body = None  # encoded view without logs (the status poll), until the next ``advance``
+        self._server = None
+        self.resources['(Tiltfile)'] = [{}, 'ok', 'not_applicable']
+        for _ in range(resources):
+            self._add_resource()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def _add_resource(self):
+        self._next_id += 1
+        labels = {f'group-{self._next_id % 7}': f'group-{self._next_id % 7}'}
+        if self._next_id % 5 == 0:
+            labels[f'team-{self._next_id // 25}'] = f'team-{self._next_id // 25}'  # labels churn too
+        self.resources[f'svc-{self._next_id}'] = [labels, *STATUSES['ok'][0]]
+
+    def _set_state(self, name, state):
+        self.resources[name][1:] = self.random.choice(STATUSES[state])
+
+    def _log(self, name, count):
+        for _ in range(count):
+            self.segments.append((name, f'{self.now:.0f} {name}: ' + 'x' * self.random.randint(20, 120) + '\n'))
+
+    def advance(self, seconds):
+        """Move the simulated clock: change states, replace resources and write logs"""
+        with self._lock:
+            self.now += seconds
+            for name in [name for name, ready_at in self._ready_at.items() if ready_at <= self.now]:
+                del self._ready_at[name]
+                if name in self.resources:  # not replaced meanwhile
+                    self._set_state(name, 'ok')
+            names = [name for name in self.resources if name != '(Tiltfile)']
+            p_change = min(1.0, self.churn * seconds / 3600)
+            for name in names:
+                if self.random.random() < p_change:
+                    self._set_state(name, self.random.choices(tuple(STATE_WEIGHTS), tuple(STATE_WEIGHTS.values()))[0])
+            self._replace_due += self.replace * seconds / 3600
+            while self._replace_due >= 1:
+                self._replace_due -= 1
+                del self.resources[self.random.choice(names)]
+                self._add_resource()
+                names = [name for name in self.resources if name != '(Tiltfile)']
+            if self.running:
+                self._log_due += self.log_rate * seconds
+                lines, self._log_due = int(self._log_due), self._log_due % 1
+                for _ in range(lines):
+                    self._log(self.random.choice(names), 1)
+                for name in names:
+                    if self.resources[name][2] == 'error':
+                        self._log(name, 1)
+                excess = len(self.segments) - self.log_segments
+                if excess > 0:
+                    del self.segments[:excess]
+                    self.checkpoint += excess
+            self._body = None
+
+    def view(self, log=False, from_checkpoint=0):
+        view = {'uiResources': [{'metadata': {'name': name, 'labels': labels},
+                                 'status': {'updateStatus': update_status, 'runtimeStatus': runtime_status}}
+                                for name, (labels, update_status, runtime_status) in self.resources.items()]}
+        if log:
+            segments = self.segments[max(0, from_checkpoint - self.checkpoint):]
+            view['logList'] = {'spans': {name: {'manifestName': name} for name in {span for span, _ in segments}},
+                               'segments': [{'spanId': span, 'text': text} for span, text in segments],
+                               'fromCheckpoint': max(from_checkpoint, self.checkpoint),
+                               'toCheckpoint': self.checkpoint + len(self.segments)}
+        return view
+
+    def _response(self, query):
+        log = query.get('log') == ['true']
+        from_checkpoint = int(query.get('fromCheckpoint', ['0'])[0])
+        with self._lock:
+            if log:
+                return json.dumps(self.view(True, from_checkpoint)).encode('utf-8')
+            if self._body is None:
+                self._body = json.dumps(self.view()).encode('utf-8')
+            return self._body
+
+    def set_running(self, running):
+        """Start serving, or stop (and refuse connections, like a stopped Tilt); A (re)started Tilt starts a new log, with pending resources"""
+        if running == self.running:
+            return
+        self.running = running
+        if not running:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            return
+        with self._lock:
+            self.checkpoint = 0
+            self.segments = []
+            self._body = None
+            for name in self.resources:
+                self._set_state(name, 'pending')
+                self._ready_at[name] = self.now + self.random.uniform(*self.start_seconds)
+        owner = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != '/api/view':
+                    self.send_error(404)
+                    return
+                body = owner._response(parse_qs(url.query))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]  # the same port after a restart
+        threading.Thread(target=self._server.serve_forever, name='soak-stub', daemon=True).start()
+
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:  # macOS
+        pass
+    try:
+        return int(subprocess.run(['ps', '-o', 'rss=', '-p', str(os.getpid())], capture_output=True, text=True).stdout) * 1024
+    except (OSError, ValueError):
+        peak = os_resource.getrusage(os_resource.RUSAGE_SELF).ru_maxrss  # peak only; bytes on macOS, KiB on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def object_types():
+    gc.collect()
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def growth(first, last):
+    return (last - first) / first * 100 if first else 0.0
+
+
+def median_of(samples, key):
+    return statistics.median(sample[key] for sample in samples)
+
+
+def run_soak(hours=4.0, resources=40, seed=1, cycle_minutes=60, down_minutes=5, sample_minutes=15, warmup_minutes=30,
+             compare_samples=3, max_rss_growth=20.0, max_objects_growth=10.0, max_latency_growth=50.0, out=sys.stdout):
+    """
+    Run the soak test; Returns the report: ``samples``, ``growth`` (percent, by ``rss``, ``objects``, ``latency`` and
+    ``cpu``; medians of the last ``compare_samples`` samples against the first ones after the warm-up),
+    ``top_growing_types``, ``startups`` (Tilt Ups) and ``failures`` (empty if it passed)
+    """
+    from tilt_monitor.engine import MonitorEngine
+    from tilt_monitor.tilt_monitor import TILT_TERM_TIMEOUT, app, config, history, hook_runner, resource_actions, tilt_processes
+
+    stub = SoakStub(resources, seed=seed)
+    stub.set_running(True)
+    config.set_base_url(stub.url)
+    hook_runner.hooks = ()  # configured hooks must not run on synthetic transitions
+    state_dir = tempfile.TemporaryDirectory(prefix='tilt-soak-')
+    history.path = os.path.join(state_dir.name, 'history.sqlite3')
+    engine = MonitorEngine()
+    engine.startup.report_dir = os.path.join(state_dir.name, 'startup_reports')
+    # Tilt Up / Tilt Down go through the engine and the process manager, with a stand-in `tilt` command
+    app.tilt = os.path.join(state_dir.name, 'tilt')
+    with open(app.tilt, 'w', encoding='utf-8') as f:
+        f.write(FAKE_TILT.format(python=sys.executable))
+    os.chmod(app.tilt, 0o755)
+    open(os.path.join(state_dir.name, 'Tiltfile'), 'w').close()
+    config.tilt_file_dir = state_dir.name
+    config.startup_profiler = True
+    tilt_processes.output_file = os.path.join(state_dir.name, 'tilt_up.log')
+
+    samples = []
+    baseline_types = None
+    latencies, cpu_times = [], []
+    sampled_at = 0.0
+    start = time.monotonic()
+    out.write(f'Soak test: {hours:g} simulated hours, {resources} resources, Tilt down {down_minutes} of every {cycle_minutes} minutes\n')
+    out.write(f"{'time':>7} {'ticks':>7} {'RSS MB':>8} {'objects':>9} {'p50 ms':>8} {'p99 ms':>8} {'CPU ms':>8}\n")
+    ticks = startups = 0
+    try:
+        while stub.now < hours * 3600:
+            up = stub.now % (cycle_minutes * 60) < (cycle_minutes - down_minutes) * 60
+            if up and not stub.running:
+                if not engine.tilt_up():
+                    raise RuntimeError('Tilt Up failed (see the log)')
+                startups += 1
+                stub.set_running(True)
+            elif not up and stub.running:
+                engine.tilt_down()  # terminates the stand-in `tilt up` (or runs `tilt down`) in the background
+                tilt_processes.wait(TILT_TERM_TIMEOUT + 5)
+                stub.set_running(False)
+            tick_start, cpu_start = time.perf_counter(), time.thread_time()
+            engine.tick()
+            if stub.running:  # a refused connection takes no time; only the ticks that did the work are compared
+                latencies.append(time.perf_counter() - tick_start)
+                cpu_times.append(time.thread_time() - cpu_start)
+            ticks += 1
+            stub.advance(engine.interval)
+            if stub.now - sampled_at < sample_minutes * 60 or not latencies:
+                continue
+            sampled_at = stub.now
+            types = object_types()
+            sample = {'t': round(stub.now), 'ticks': ticks, 'rss': rss_bytes(), 'objects': sum(types.values()),
+                      'p50': statistics.median(latencies), 'p99': sorted(latencies)[int(len(latencies) * 0.99)],
+                      'cpu': statistics.mean(cpu_times)}
+            latencies, cpu_times = [], []
+            samples.append(sample)
+            if stub.now >= warmup_minutes * 60:
+                sample['warm'] = True
+                if baseline_types is None:
+                    baseline_types = types
+            out.write(f"{sample['t'] / 3600:6.2f}h {ticks:7} {sample['rss'] / 1048576:8.1f} {sample['objects']:9} "
+                      f"{sample['p50'] * 1000:8.2f} {sample['p99'] * 1000:8.2f} {sample['cpu'] * 1000:8.2f}"
+                      f"{'' if sample.get('warm') else '  (warm-up)'}\n")
+            out.flush()
+        final_types = object_types()
+    finally:
+        if tilt_processes.is_alive():
+            engine.tilt_down()
+            tilt_processes.wait(TILT_TERM_TIMEOUT + 5)
+        stub.set_running(False)
+        history.close()  # only what the soak started; `stop_services` would also remove a running app's prompt status file
+        resource_actions.shutdown()
+        state_dir.cleanup()
+
+    report = {'hours': hours, 'ticks': ticks, 'startups': startups, 'seconds': round(time.monotonic() - start, 1),
+              'samples': samples, 'growth': {}, 'top_growing_types': [], 'failures': []}
+    warm = [sample for sample in samples if sample.get('warm')]
+    window = min(compare_samples, len(warm) // 2)  # the first and last windows never overlap
+    if window < 1:
+        report['failures'].append(f'Too short to compare: fewer than 2 samples after the {warmup_minutes} minute warm-up')
+        return report
+    base, last = warm[:window], warm[-window:]
+    report['growth'] = {key: growth(median_of(base, field), median_of(last, field))
+                        for key, field in (('rss', 'rss'), ('objects', 'objects'), ('latency', 'p50'), ('cpu', 'cpu'))}
+    report['top_growing_types'] = [(name, count) for name, count in (final_types - baseline_types).most_common(10)]
+    for key, limit in (('rss', max_rss_growth), ('objects', max_objects_growth), ('latency', max_latency_growth), ('cpu', max_latency_growth)):
+        if report['growth'][key] > limit:
+            report['failures'].append(f"{key} grew {report['growth'][key]:.1f}% (limit {limit:g}%)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the monitoring engine for hours of accelerated time against a synthetic Tilt, '
+                                                 'and fail if memory or CPU per tick grows')
+    parser.add_argument('--hours', type=float, default=4.0, help='Simulated hours (default: 4)')
+    parser.add_argument('--resources', type=int, default=40, help='Number of resources (default: 40)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed of the synthetic Tilt (default: 1)')
+    parser.add_argument('--cycle-minutes', type=float, default=60, help='Tilt stops once in this many minutes (default: 60)')
+    parser.add_argument('--down-minutes', type=float, default=5, help='Minutes Tilt stays down per cycle (default: 5)')
+    parser.add_argument('--sample-minutes', type=float, default=15, help='Simulated minutes between samples (default: 15)')
+    parser.add_argument('--warmup-minutes', type=float, default=30, help='Simulated minutes before the baseline samples (default: 30)')
+    parser.add_argument('--compare-samples', type=int, default=3,
+                        help='Samples whose medians are compared, at the start and at the end (default: 3)')
+    parser.add_argument('--max-rss-growth', type=float, default=20.0, metavar='PERCENT', help='RSS growth limit (default: 20)')
+    parser.add_argument('--max-objects-growth', type=float, default=10.0, metavar='PERCENT', help='Live object count growth limit (default: 10)')
+    parser.add_argument('--max-latency-growth', type=float, default=50.0, metavar='PERCENT',
+                        help='Median tick latency and CPU time per tick growth limit (default: 50)')
+    parser.add_argument('--report', default=None, metavar='PATH', help='Also write the report (with every sample) as JSON')
+    args = parser.parse_args()
+
+    report = run_soak(args.hours, args.resources, args.seed, args.cycle_minutes, args.down_minutes, args.sample_minutes,
+                      args.warmup_minutes, args.compare_samples, args.max_rss_growth, args.max_objects_growth, args.max_latency_growth)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"\n{report['ticks']} ticks and {report['startups']} Tilt Ups in {report['seconds']}s; Growth since the baseline: "
+          + ', '.join(f'{key} {value:+.1f}%' for key, value in report['growth'].items()))
+    if report['top_growing_types']:
+        print('Most grown object types: ' + ', '.join(f'{name} +{count}' for name, count in report['top_growing_types']))
+    if report['failures']:
+        print('FAIL: ' + '; '.join(report['failures']))
+        sys.exit(1)
+    print('PASS')
+
+
+if __name__ == '__main__':
+    main()
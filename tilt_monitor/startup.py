@@ -0,0 +1,155 @@
+"""Startup profiler: time-to-ready per resource after `tilt up`, with a JSON report per run (stdlib only)"""
+from datetime import datetime
+import glob
+import json
+import os
+import time
+
+
+REPORT_SUFFIX = '.json'
+
+
+class StartupProfiler:
+    """
+    Follows the resources from `tilt up` until all of them are ready (or ``timeout`` seconds pass).
+
+    ``observe()`` is called with every snapshot's resources; A resource's times are the offsets (in seconds since
+    `tilt up`) of the snapshots in which it was first seen, first building (``in_progress``) and first ``ok``, so their
+    resolution is the poll interval.
+    """
+    def __init__(self, report_dir, log, timeout=1800, keep=50):
+        self.report_dir = report_dir
+        self._log = log
+        self.timeout = timeout
+        self.keep = keep  # number of reports kept
+        self.run_id = None
+        self.tilt_file_dir = ''
+        self.resources = {}
+        self.last_report = None
+        self._start = None
+        self._started_at = None
+
+    @property
+    def active(self):
+        return self._start is not None
+
+    def start(self, tilt_file_dir=''):
+        self.run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.resources = {}
+        self.tilt_file_dir = tilt_file_dir
+        self._start = time.monotonic()
+        self._started_at = time.time()
+        self._log(f'Profiling Tilt startup (run {self.run_id})')
+
+    def observe(self, result_list):
+        """
+        Record the transitions in ``result_list`` (``Resource`` records).
+        :return: The report path once the run is finished (all resources ok, or timed out), otherwise None
+        """
+        if not self.active:
+            return None
+        now = round(time.monotonic() - self._start, 3)
+        for record in result_list:
+            if record.disabled:
+                continue  # never becomes ready
+            resource = self.resources.get(record.name)
+            if resource is None:
+                resource = self.resources[record.name] = {
+                    'label': record.label, 'first_seen': now, 'building': None, 'ready': None, 'errors': 0, 'transitions': [],
+                }
+            statuses = [record.update_status, record.runtime_status]
+            if resource['transitions'] and resource['transitions'][-1][1:] == statuses:
+                continue
+            resource['transitions'].append([now] + statuses)
+            state = record.state_name
+            if resource['building'] is None and 'in_progress' in statuses:
+                resource['building'] = now
+            if state == 'error':
+                resource['errors'] += 1
+            elif state == 'ok' and resource['ready'] is None:
+                resource['ready'] = now
+
+        if self.resources and all(r['ready'] is not None for r in self.resources.values()):
+            return self.finish(completed=True)
+        if now > self.timeout:
+            self._log(f'Tilt startup did not finish within {self.timeout} seconds', 'WARN')
+            return self.finish(completed=False)
+        return None
+
+    def finish(self, completed=False):
+        """Write the report (also for an unfinished run, e.g. on `tilt down`); Returns its path"""
+        if not self.active:
+            return None
+        report = self.last_report = self.report(completed)
+        self._start = None
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f'{self.run_id}{REPORT_SUFFIX}')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        for old_path in list_reports(self.report_dir)[:-self.keep]:
+            os.remove(old_path)
+        if completed:
+            self._log(f'Tilt startup took {report["time_to_green"]} seconds; Slowest: '
+                      + ', '.join(f'{name} ({ready}s)' for name, ready in report['slowest'][:3]))
+        self._log(f'Startup report saved: {path}')
+        return path
+
+    def report(self, completed):
+        elapsed = round(time.monotonic() - self._start, 3)
+        for resource in self.resources.values():
+            resource['build_time'] = None if resource['ready'] is None or resource['building'] is None \
+                else round(resource['ready'] - resource['building'], 3)
+        ready = sorted(((name, r['ready']) for name, r in self.resources.items() if r['ready'] is not None),
+                       key=lambda item: item[1], reverse=True)
+        return {
+            'run_id': self.run_id,
+            'started': self._started_at,
+            'tilt_file_dir': self.tilt_file_dir,
+            'completed': completed,
+            'time_to_green': elapsed if completed else None,
+            'duration': elapsed,
+            'slowest': ready[:10],  # the last resources to become ready: the critical path of the startup
+            'not_ready': sorted(name for name, r in self.resources.items() if r['ready'] is None),
+            'resources': self.resources,
+        }
+
+
+def list_reports(report_dir):
+    """Report paths, oldest first"""
+    return sorted(glob.glob(os.path.join(report_dir, f'*{REPORT_SUFFIX}')))
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def format_report(report, previous=None):
+    """Render a report as a table of resources (slowest first), with the change from a ``previous`` report"""
+    def _secs(value):
+        return '-' if value is None else f'{value:.1f}s'
+
+    def _delta(value, prv_value):
+        if value is None or prv_value is None:
+            return ''
+        return f'{value - prv_value:+.1f}s'
+
+    started = datetime.fromtimestamp(report['started']).strftime('%Y-%m-%d %H:%M:%S')
+    total = _secs(report['time_to_green']) if report['completed'] else f'not green after {_secs(report["duration"])}'
+    lines = [f'Tilt startup {report["run_id"]} (started {started}): {total}']
+    if previous is not None and report['completed'] and previous['completed']:
+        lines[0] += f' ({_delta(report["time_to_green"], previous["time_to_green"])} vs. {previous["run_id"]})'
+    lines.append('')
+
+    resources = report['resources']
+    prv_resources = previous['resources'] if previous else {}
+    order = sorted(resources, key=lambda name: (resources[name]['ready'] is not None, -(resources[name]['ready'] or 0)))  # not ready first
+    name_width = max([len('Resource')] + [len(name) for name in resources])
+    lines.append(f'{"Resource".ljust(name_width)} | Ready   | Build   | Errors | Change')
+    lines.append(f'{"-" * name_width}-+---------+---------+--------+--------')
+    for name in order:
+        resource = resources[name]
+        prv_ready = prv_resources.get(name, {}).get('ready')
+        lines.append(f'{name.ljust(name_width)} | {_secs(resource["ready"]).rjust(7)} | {_secs(resource["build_time"]).rjust(7)} | '
+                     f'{str(resource["errors"]).rjust(6)} | {_delta(resource["ready"], prv_ready)}')
+    return '\n'.join(lines)
@@ -1,23 +1,43 @@
 import argparse
 from datetime import datetime
 import glob
+import itertools
 import json
 import os
 from pathlib import Path
-import rumps
 import requests
-import shutil
 import subprocess
 import sys
+import threading
+import time
 import traceback
-import webbrowser
-
-import Foundation
-
-
-bundle = Foundation.NSBundle.mainBundle()
-bundle_path = bundle.bundlePath()
-info = bundle.infoDictionary() or {}
+from urllib.parse import urlsplit
+
+from tilt_monitor.actions import ResourceActions
+from tilt_monitor.breaker import OPEN, CircuitBreaker, CircuitOpenError
+from tilt_monitor.config import Config, DEFAULT_CONFIG
+from tilt_monitor.history import HistoryRecorder
+from tilt_monitor.hooks import HookRunner
+from tilt_monitor.ipc import SnapshotServer
+from tilt_monitor.labels import LabelIndex
+from tilt_monitor.metrics import MetricsRegistry, MetricsServer, SIZE_BUCKETS, format_family
+from tilt_monitor.perf import PerfStats
+from tilt_monitor.process import TiltProcessManager
+from tilt_monitor.profiling import Profiler
+from tilt_monitor.prompt import PROMPT_FILE_NAME, write_prompt_status
+from tilt_monitor.snapshot_store import read_snapshot, write_snapshot
+from tilt_monitor.resources import (
+    ResourceTable, STATES, STATE_DISABLED, STATE_ERROR, STATE_OK, STATE_PENDING, get_resource_labels,
+)
+
+try:
+    import Foundation
+    bundle = Foundation.NSBundle.mainBundle()
+    bundle_path = bundle.bundlePath()
+    info = bundle.infoDictionary() or {}
+except ImportError:  # not on macOS (headless mode)
+    bundle_path = ''
+    info = {}
 APP_NAME = info.get('CFBundleDisplayName', 'Tilt Monitor')
 APP_VERSION = info.get('CFBundleShortVersionString', 'dev')
 APP_DESCRIPTION = info.get('ASApplicationDescription', '')
@@ -26,17 +46,6 @@ APP_URL = info.get('ApplicationHomepageURL', '')
 HOME = str(Path.home())
 SHELL = os.environ.get('SHELL', '/bin/zsh')
 
-# Config defaults
-DEFAULT_CONFIG = {
-    'tilt_file_path': '',  # supports both file path and parent dir (with or without '/Tiltfile')
-    'tilt_base_url': 'http://localhost:10350',
-    'tilt_context': 'docker-desktop',
-    'keepalive_interval': 3,  # Interval for tilt status checks
-    'sleep_interval': 30,  # Interval for status checks when tilt is down
-    'tilt_cmd_args': '',  # For any other args other than -f and --context
-    'env_vars': {}
-}
-
 # Paths
 script_name = os.path.splitext(os.path.basename(__file__))[0]
 int_app_name = APP_NAME.replace(' ', '')
@@ -55,6 +64,13 @@ os.makedirs(log_dir, exist_ok=True)
 # Paths - Files
 config_file = os.path.join(config_dir, f'{script_name}_config.json')
 log_file = os.path.join(log_dir, f'{script_name}.log')
+tilt_up_log_file = os.path.join(log_dir, 'tilt_up.log')
+perf_stats_file = os.path.join(config_dir, 'perf_stats.json')
+ipc_socket_file = os.path.join(config_dir, f'{script_name}.sock')
+prompt_status_file = os.path.join(config_dir, PROMPT_FILE_NAME)
+startup_reports_dir = os.path.join(config_dir, 'startup_reports')
+last_snapshot_file = os.path.join(config_dir, 'last_snapshot.json')
+history_file = os.path.join(config_dir, 'history.sqlite3')
 tmp_file_pfx = '/tmp/tilt_monitor_'
 
 # Resources
@@ -68,94 +84,115 @@ default_icon = gray_icon
 _env = os.environ.copy()
 os.environ.update({k: v for k, v in _env.items() if k.startswith('TMB_')})
 terminal_env = None
+_terminal_env_lock = threading.Lock()  # a single login shell, even if `tilt up` is clicked while it is still loading
+
+
+def ex(e):
+    tb = traceback.extract_tb(e.__traceback__)
+    frame = next((f for f in reversed(tb) if os.path.basename(f.filename) == f'{script_name}.py'), tb[-1])
+    return f'{e.__class__.__name__}][{frame.name}:{frame.lineno}'
+
+
+def log(value, log_level='INFO', exception=None):  # ToDo - replace with proper logging
+    ts = f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}]'
+    lvl = f'[{log_level.upper()}]'.ljust(7)
+    log_line = f'{value}'
+    if exception:
+        log_line = f'[{ex(exception)}] {log_line}\n{traceback.format_exc()}'
+    with open(log_file, 'a+') as f:
+        f.write(f'{ts} {lvl} {log_line}\n')
 
 
 def load_config():
-    """Load configuration from file or create with defaults if it doesn't exist"""
+    """Load and validate the configuration file (see ``Config``), or create it with defaults if it doesn't exist"""
     if not os.path.exists(config_file):
         # Create default config file
         cfg_json = json.dumps(DEFAULT_CONFIG, indent=4)
         with open(config_file, 'w', encoding='utf-8') as f:
             f.write(cfg_json)
-        return DEFAULT_CONFIG
+        return Config(DEFAULT_CONFIG)
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
             cfg = json.load(f)
-
-        # Ensure all keys exist (in case config file is outdated)
-        for key, value in DEFAULT_CONFIG.items():
-            if key not in cfg:
-                cfg[key] = value
-                log(f'Key "{key}" not found in config file; Using default value: {value}', 'WARN')
-
-        return cfg
+        if not isinstance(cfg, dict):
+            raise ValueError('The configuration must be a JSON object')
     except Exception as load_err:
-        log(f'Error loading config: {load_err}', 'ERROR', traceback.format_exc())
-        return DEFAULT_CONFIG
+        log(f'Error loading config: {load_err}', 'ERROR', load_err)
+        return Config(DEFAULT_CONFIG)
+
+    # Missing keys (e.g. config file is outdated) get their default value
+    for key, value in DEFAULT_CONFIG.items():
+        if key not in cfg:
+            log(f'Key "{key}" not found in config file; Using default value: {value}', 'WARN')
+    for key in cfg.keys() - DEFAULT_CONFIG.keys():
+        log(f'Unknown key "{key}" in config file; Ignored', 'WARN')
+    loaded = Config(cfg)
+    for error in loaded.errors:
+        log(f'Invalid config: {error}', 'ERROR')
+    return loaded
 
 # Load configuration
 config = load_config()
-keepalive_interval = config['keepalive_interval']
-sleep_interval = config['sleep_interval']
-tilt_base_url = config['tilt_base_url']
-tilt_file_path = config['tilt_file_path']
-tilt_context = config['tilt_context']
-tilt_cmd_args = config['tilt_cmd_args']
-custom_env_vars = config['env_vars']
-
-# Variables
-if tilt_file_path.endswith('Tiltfile'):
-    tilt_file_path = os.path.dirname(tilt_file_path)
-
-if tilt_context:
-    tilt_cmd_args += f' --context {tilt_context}'
 
 # App Settings
-tilt_status_url = f'{tilt_base_url}/api/view?log=true'
-tilt_ui_url = f'{tilt_base_url}/overview'
-
-MENU_OPT_STATUS_SUMMARY = 'Status Summary'
-MENU_OPT_OPEN_UI = 'Open Tilt UI'
-MENU_OPT_TILT_UP = 'Tilt Up'
-MENU_OPT_TILT_STARTING = 'Tilt Starting...'
-MENU_OPT_TILT_DOWN = 'Tilt Down'
-MENU_OPT_EDIT_CONFIG = 'Edit Configuration'
-MENU_OPT_RELOAD = 'Reload'
-MENU_OPT_SHOW_LOG = 'Show Log'
-MENU_OPT_ABOUT = f'About {APP_NAME}'
+LOG_TAIL_TIMEOUT = 5  # seconds
+API_CONNECT_TIMEOUT = 3  # seconds to connect to the Tilt API
+API_READ_TIMEOUT = 10  # max seconds from connecting until the whole response is read
+BREAKER_FAILURES = 3  # consecutive hangs/server errors that open the API circuit
+BREAKER_RESET_TIMEOUT = 15  # seconds until the first probe of an open circuit (doubles while probes fail)
+BREAKER_MAX_RESET_TIMEOUT = 120
+ACTION_TIMEOUT = 30  # seconds per resource action (trigger/enable/disable)
+HOOK_QUEUE_SIZE = 32  # max hook runs waiting for a worker; more are dropped
+TRIGGER_BUILD_REASON = 16  # Tilt's BuildReasonFlagTriggerWeb: a manual trigger, as from the web UI
 
 parser = argparse.ArgumentParser(description='Tilt Status Menu Bar App')
-parser.add_argument('-t', '--time-interval', type=int, default=None, help=f'Time interval in seconds for status check (default: {keepalive_interval})')
+parser.add_argument('-t', '--time-interval', type=int, default=None, help=f'Time interval in seconds for status check (default: {config.keepalive_interval})')
 parser.add_argument('-u', '--up', action='store_true', help=f'Run `tilt up` command on startup')
+parser.add_argument('--headless', action='store_true', help='Run the monitor without the menu bar, writing state transitions as NDJSON')
+parser.add_argument('-o', '--output', default='-', help='Headless mode: NDJSON output file (default: stdout)')
+parser.add_argument('--base-url', default=None, help=f'Override the Tilt API base URL (default: {config.base_url})')
+parser.add_argument('--profile', action='store_true', help=f'Profile the timer callbacks (cProfile) and memory allocations (tracemalloc), with dumps in {log_dir}')
 parser.add_argument('--reloaded', action='store_true', help=argparse.SUPPRESS)
 
 app = sys.modules[__name__]
 app.tilt_healthy = None
 app.tilt_running = None
 app.tilt = 'tilt'  # default; will not work until environment variables are added
-
-
-def ex(e):
-    tb = traceback.extract_tb(e.__traceback__)
-    frame = next((f for f in reversed(tb) if os.path.basename(f.filename) == f'{script_name}.py'), tb[-1])
-    return f'{e.__class__.__name__}][{frame.name}:{frame.lineno}'
-
-
-def log(value, log_level='INFO', exception=None):  # ToDo - replace with proper logging
-    ts = f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}]'
-    lvl = f'[{log_level.upper()}]'.ljust(7)
-    log_line = f'{value}'
-    if exception:
-        log_line = f'[{ex(exception)}] {log_line}\n{traceback.format_exc()}'
-    with open(log_file, 'a+') as f:
-        f.write(f'{ts} {lvl} {log_line}\n')
+app.snapshot = {'generation': 0, 'timestamp': None, 'running': None, 'resources': [], 'disabled': [], 'state_counts': {}, 'healthy': None, 'stale': False}
+app.label_index = LabelIndex()  # follows the snapshot's resources
+app.snapshot_listeners = []  # called (with no args) whenever the snapshot content changes
+app.ipc_server = None
+app.launched_at = time.monotonic()  # see `record_launch_time`
+app.launch_times = {}
+
+# Metrics (served by the optional OpenMetrics endpoint)
+metrics = MetricsRegistry()
+poll_duration = metrics.histogram('tilt_monitor_poll_duration_seconds', 'Duration of Tilt status API calls', unit='seconds')
+poll_response_size = metrics.histogram('tilt_monitor_poll_response_size_bytes', 'Size of Tilt status API responses', unit='bytes', buckets=SIZE_BUCKETS)
+poll_errors = metrics.counter('tilt_monitor_poll_errors', 'Failed Tilt status API calls by error kind')
+check_interval = metrics.gauge('tilt_monitor_check_interval_seconds', 'Current status check timer interval', unit='seconds')
+hook_runs = metrics.counter('tilt_monitor_hook_runs', 'Transition hook runs by result (ok, failed, timeout, deduplicated, dropped)')
+launch_time = metrics.gauge('tilt_monitor_launch_seconds', 'Seconds from launch to the first icon and to the first Tilt status', unit='seconds')
+
+# Hot-path timers
+perf = PerfStats(enabled=config.perf_stats)
+PERF_DUMP_INTERVAL = 30  # seconds between stats dumps for `tilt-status --stats`
+profiler = Profiler(log_dir, log)  # off unless started (`--profile`, `TMB_PROFILE=1` or the menu)
+
+# Shutdown
+TILT_TERM_TIMEOUT = 10  # seconds from SIGTERM to SIGKILL of the `tilt up` process group
+TILT_DOWN_TIMEOUT = 120  # seconds before a hanging `tilt down` is killed
+QUIT_TIMEOUT = 15  # max seconds Quit waits for Tilt to stop
 
 
 def rotate_logs():
+    """Start a new log file; Old logs are pruned by ``prune_logs`` (in the background, see ``main``)"""
     if os.path.exists(log_file):
         timestamp = datetime.now().strftime('%Y%m%d%H%M')
         os.rename(log_file, f'{log_file}.{timestamp}')
 
+
+def prune_logs():
     log_pattern = f'{log_file}.*'
     existing_logs = sorted([f for f in glob.glob(log_pattern)], reverse=True)
     for old_log in existing_logs[4:]:
@@ -165,9 +202,13 @@ def rotate_logs():
 def get_terminal_environ():
     """Obtain a clean environment from a terminal to be used for tilt commands (instead of using this app's sanitized env"""
     global terminal_env
-    if terminal_env is not None:
-        return terminal_env
+    with _terminal_env_lock:
+        if terminal_env is None:
+            terminal_env = _load_terminal_environ()
+    return terminal_env
+
 
+def _load_terminal_environ():
     base_env = {}
     for key in ['HOME', 'USER', 'LOGNAME', 'LANG']:
         val = os.environ.get(key)
@@ -175,12 +216,12 @@ def get_terminal_environ():
             base_env[key] = val
     env_output = subprocess.check_output([SHELL, '-l', '-c', 'env'], text=True, env=base_env).strip()
     # log('[DEBUG] Terminal env:\n' + "\n".join(f"\t{p}" for p in env_output.splitlines()))
-    terminal_env = dict(line.split('=', 1) for line in env_output.splitlines() if '=' in line)
-    if custom_env_vars:
-        log(f'Updating custom environment variables:\n' + "\n".join(f"\t{k}={v}" for k, v in custom_env_vars.items()))
-        for k, v in custom_env_vars.items():
-            terminal_env[k] = v
-    return terminal_env
+    loaded_env = dict(line.split('=', 1) for line in env_output.splitlines() if '=' in line)
+    if config.env_vars:
+        log(f'Updating custom environment variables:\n' + "\n".join(f"\t{k}={v}" for k, v in config.env_vars.items()))
+        for k, v in config.env_vars.items():
+            loaded_env[k] = v
+    return loaded_env
 
 
 def update_environ():
@@ -196,54 +237,165 @@ def update_environ():
         log(f'Error updating PATH environment variable: {e}', 'ERROR', e)
 
 
-def rumps_alert(title, message, ok='OK', other=None, cancel=None, callback=None):
-    if not hasattr(sys, 'frozen') and not sys.argv[0].endswith('.app/Contents/MacOS/'):
-        return 0
-    return rumps.alert(title, message, ok, other, cancel, callback)
+def run_in_background(target, name):
+    """Run ``target()`` on a daemon thread, logging (not raising) its errors; Returns the thread"""
+    def _run():
+        try:
+            target()
+        except Exception as bg_err:
+            log(f'Error in background task {name}: {bg_err}', 'ERROR', bg_err)
+    thread = threading.Thread(target=_run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def record_launch_time(milestone):
+    """Record the time from launch to a ``milestone`` (``first_icon``, ``first_status``), once per process"""
+    if milestone in app.launch_times:
+        return
+    seconds = app.launch_times[milestone] = round(time.monotonic() - app.launched_at, 3)
+    launch_time.set(seconds, milestone=milestone)
+    perf.record(f'launch_{milestone}', seconds)
+    log(f'Time to {milestone.replace("_", " ")}: {seconds} seconds')
+
+
+def poll_error_kind(err):
+    if isinstance(err, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(err, requests.Timeout):
+        return 'timeout'
+    if isinstance(err, (ConnectionError, requests.ConnectionError)):
+        return 'connection'
+    if isinstance(err, requests.HTTPError):
+        return 'http'
+    if isinstance(err, ValueError):
+        return 'decode'
+    return 'other'
+
+
+def is_breaker_failure(err):
+    """Whether an API error means Tilt is hanging or broken (a refused connection only means it is not running)"""
+    if isinstance(err, requests.Timeout):
+        return True
+    if isinstance(err, requests.HTTPError):
+        return err.response is not None and err.response.status_code >= 500
+    return isinstance(err, ValueError)
 
 
 def api_get_tilt_status(timeout=None):
-    res = requests.get(tilt_status_url, timeout=timeout)
+    """
+    Get the Tilt view, filtered by ``config.resource_filter``.
+    :param timeout: Deadline in seconds for both connecting and reading the whole response;
+                    Defaults to ``API_CONNECT_TIMEOUT`` and ``API_READ_TIMEOUT``
+    :raise CircuitOpenError: If Tilt has been failing and the next probe is not due yet (see ``api_breaker``)
+    """
+    connect_timeout, read_timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT) if timeout is None else (timeout, timeout)
+    start = time.perf_counter()
+    try:
+        if not api_breaker.allow():
+            raise CircuitOpenError(f'Tilt API is not responding; Next probe in {api_breaker.retry_in} seconds')
+        try:
+            with perf.timer('connect'):
+                res = requests.get(config.status_url, timeout=(connect_timeout, read_timeout), stream=True)  # returns once headers are received
+            res.raise_for_status()
+            with perf.timer('download'):
+                deadline = time.monotonic() + read_timeout  # the read timeout alone only limits each socket read
+                chunks = []
+                for chunk in res.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                    if time.monotonic() > deadline:
+                        res.close()
+                        raise requests.ReadTimeout(f'Tilt API response took more than {read_timeout} seconds')
+                content = b''.join(chunks)
+            with perf.timer('decode'):
+                data = json.loads(content)
+        except Exception as api_err:
+            if is_breaker_failure(api_err):
+                api_breaker.record_failure(api_err)
+            else:
+                api_breaker.record_success()  # the API answered (e.g. refused: Tilt is down)
+            raise
+        api_breaker.record_success()
+        if 'uiResources' in data:
+            with perf.timer('filter'):
+                data['uiResources'] = config.resource_filter.apply(data['uiResources'], get_resource_labels)
+    except Exception as api_err:
+        poll_errors.inc(kind=poll_error_kind(api_err))
+        raise
+    poll_duration.observe(time.perf_counter() - start)
+    poll_response_size.observe(len(content))
+    return data
+
+
+def api_get_tilt_logs(from_checkpoint=0, timeout=LOG_TAIL_TIMEOUT):
+    """Get the Tilt view with its log segments after ``from_checkpoint`` (see ``LogTailer``)"""
+    res = requests.get(config.view_url, params={'log': 'true', 'fromCheckpoint': from_checkpoint}, timeout=timeout)
     res.raise_for_status()
     return res.json()
 
 
-def get_tilt_status():
-    data = api_get_tilt_status()
-
-    resources = data.get('uiResources', [])
-    result_list = []
+def api_resource_action(action, r_name, timeout=ACTION_TIMEOUT):
+    """
+    Trigger, enable or disable a single resource (see ``ResourceActions``); Raises on failure.
+    Triggers are posted to the Tilt web API; Enabling and disabling goes through Tilt's API server, with the `tilt` CLI as client.
+    """
+    if api_breaker.state == OPEN:
+        raise CircuitOpenError(f'Tilt API is not responding; Next probe in {api_breaker.retry_in} seconds')
+    if action == 'trigger':
+        res = requests.post(f'{config.base_url}/api/trigger', json={'manifest_names': [r_name], 'build_reason': TRIGGER_BUILD_REASON},
+                            timeout=(API_CONNECT_TIMEOUT, timeout))
+        res.raise_for_status()
+        return
+    url = urlsplit(config.base_url)
+    cmd = [app.tilt, action, r_name, '--host', url.hostname or 'localhost', '--port', str(url.port or 10350)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr or proc.stdout).strip() or f'`tilt {action}` exited with code {proc.returncode}')
+
+
+resource_table = ResourceTable(config.resource_filter.skip_disabled)  # the latest record of every resource, reused while it does not change
+
+
+def project_resources(data=None):
+    """Update ``resource_table`` from a Tilt view (fetched if not given); Returns the table"""
+    if data is None:
+        data = api_get_tilt_status()
+    with perf.timer('project'):
+        resource_table.update(data.get('uiResources', []))
+    return resource_table
 
-    for r in resources:
-        meta = r['metadata']
-        status = r['status']
-        r_name = meta['name']
-        r_label = [v for k, v in meta.get('labels', {}).items()][0] if 'labels' in meta \
-            else 'Tiltfile' if r_name == '(Tiltfile)' \
-            else 'unlabeled'
-        update_status = status['updateStatus']
-        runtime_status = status['runtimeStatus']
-        if update_status != 'none':
-            result_list.append((r_label, r_name, update_status, runtime_status))
 
-    # Sort order: Items with labels (A->Z) >> Items without label >> Tiltfile
-    result_list.sort(key=lambda x: (x[0] == 'Tiltfile', x[0] == 'unlabeled', x[0]))
-    return result_list
+def get_tilt_status(data=None):
+    """
+    :return: List of ``Resource`` records with an update status, sorted by label:
+             Items with labels (A->Z) >> Items without label >> Tiltfile
+             The same list object is returned as long as no resource changed.
+    """
+    return project_resources(data).resources
 
 
 def is_tilt_healthy(result_list=None):
     prv_tilt_healthy = app.tilt_healthy
     if result_list is None:
         result_list = get_tilt_status()
-    statuses = [status for rs in result_list for status in [rs[2], rs[3]] if status != 'not_applicable']
-    if any(s == 'error' for s in statuses):
+    has_error = has_pending = has_unknown = False
+    for resource in result_list:
+        if resource.state == STATE_ERROR:
+            has_error = True
+            break
+        if resource.state == STATE_PENDING:
+            has_pending = True
+        elif resource.state not in (STATE_OK, STATE_DISABLED):
+            has_unknown = True
+    if has_error:
         tilt_healthy = False
-    elif any(s in ['pending', 'in_progress'] for s in statuses):
+    elif has_pending:
         tilt_healthy = None
-    elif all(s == 'ok' for s in statuses):
+    elif not has_unknown:
         tilt_healthy = True
     else:
-        log(f'Unknown Tilt status:\n{statuses}', 'WARN')
+        unknown = [f'{r.name}: {r.update_status}/{r.runtime_status}' for r in result_list if r.state not in (STATE_OK, STATE_PENDING, STATE_DISABLED)]
+        log(f'Unknown Tilt status:\n{unknown}', 'WARN')
         tilt_healthy = False
     if tilt_healthy != prv_tilt_healthy:
         tilt_status_text, log_lvl = \
@@ -255,15 +407,19 @@ def is_tilt_healthy(result_list=None):
     return tilt_healthy
 
 
-def is_tilt_running():
-    try:
-        _ = api_get_tilt_status(timeout=2)
+def set_tilt_running(api_err=None):
+    """
+    Set ``app.tilt_running`` from the outcome of a status poll (no request of its own): Tilt is running unless its
+    connection was refused.
+    :param api_err: The exception ``api_get_tilt_status`` raised, or None if it succeeded
+    """
+    if api_err is None:
         is_running = True
         log_msg = 'Tilt daemon is running'
-    except (ConnectionError, requests.ConnectionError):
+    elif isinstance(api_err, (ConnectionError, requests.ConnectionError)):
         is_running = False
         log_msg = 'Tilt daemon is not running'
-    except requests.RequestException:
+    else:
         is_running = True
         log_msg = 'Tilt daemon is running, but status API returned an error'
     if is_running != app.tilt_running:
@@ -274,11 +430,7 @@ def is_tilt_running():
 
 def get_tilt_file_path():
     """Gets and normalizes the tilt_file_path from the latest config."""
-    cfg = load_config()
-    path = cfg.get('tilt_file_path', '')
-    if path.endswith('Tiltfile'):
-        path = os.path.dirname(path)
-    return path
+    return load_config().tilt_file_dir
 
 
 def is_tiltfile_path_valid(path_str):
@@ -296,103 +448,50 @@ def is_app_location_valid():
     return False
 
 
-def move_to_applications():
-    """Move the app bundle to the Applications folder. NOTE: Must be run only after TiltMonitorApp was initialized to use rump commands"""
-    app_name = os.path.basename(bundle_path)
-    destination_path = os.path.join('/Applications', app_name)
-    dest_exists = os.path.exists(destination_path)
-
-    alert_msg = (f'To keep your applications organized, it is recommended to move {APP_NAME} to your Applications folder.\n\n'
-                 f'Would you like to move it now{" (overwrite the existing version)" if dest_exists else ""} and relaunch?')
-    response = rumps_alert(title=f'Move {APP_NAME}?', message=alert_msg, ok='Move to Applications', cancel="Don't Move")
-    if response == 1:  # OK button
-        try:
-            if dest_exists:
-                log(f'Removing existing destination: {destination_path}')
-                shutil.rmtree(destination_path)
-            log(f'Moving {bundle_path} to {destination_path}')
-            shutil.move(bundle_path, destination_path)
-            log('Relaunching from new location')
-            subprocess.Popen(['open', destination_path])
-            rumps.quit_application()
-        except Exception as mv_err:
-            log(f'Failed to move application: {mv_err}', 'ERROR', mv_err)
-            alert_msg = f'Could not move {APP_NAME} to the Applications folder.\n\nPlease do it manually.'
-            rumps_alert(title='Move Failed', message=alert_msg, ok='OK')
-
-
 def run_tilt_command(command):
-    """Run a tilt command (up/down) with configured arguments"""
+    """
+    Run a tilt command (up/down) with configured arguments.
+    `tilt up` is started in its own process group; `tilt down` stops Tilt in the background (see ``TiltProcessManager.stop``).
+    """
     try:
         cmd_env = os.environ.copy()
         cmd = [app.tilt, command]
         if command == 'up': # ToDo - Add --host and --port to all commands, to support multiple Tilt instances
-            cmd.extend(tilt_cmd_args.split())
+            cmd.extend(config.tilt_up_args)
             try:
                 cmd_env = get_terminal_environ()
             except Exception as env_err:
                 log(f'Cannot run `tilt {command}`; Error getting terminal environment: {str(env_err)}', 'ERROR', env_err)
                 return False, None
 
-        log(f'Running command: {" ".join(cmd)}')
-        process = subprocess.Popen(cmd, cwd=tilt_file_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=cmd_env)
-        log(f'Command `tilt {command}` executed')
-        return True, process
+            log(f'Running command: {" ".join(cmd)}')
+            process = tilt_processes.start(cmd, cwd=config.tilt_file_dir, env=cmd_env)
+            log(f'Command `tilt {command}` executed')
+            return True, process
+
+        return tilt_processes.stop(cmd, cwd=config.tilt_file_dir, env=cmd_env), None
     except Exception as cmd_err:
         log(f'Error running `tilt {command}`: {str(cmd_err)}', 'ERROR', cmd_err)
         return False, None
 
 
-def rumps_notification(subtitle, message):
-    """
-    :param title: The notification title (required)
-    :param subtitle: The notification subtitle (optional)
-    :param message: The notification message/body (optional)
-    :param data: Custom data to be passed to callback (optional)
-    :param sound: Boolean to enable/disable sound (default True)
-    :param icon: Path to icon image (optional)
-    :param action_button: Text for the action button (optional)
-    :param other_button: Text for the other button (optional)
-    :param callback: Function to call when notification is clicked (optional)
-    :return:
-    """
-    try:
-        rumps.notification(APP_NAME, subtitle, message)
-    except RuntimeError:
-        log(f'Notification not shown:\n\t{subtitle}\n\t{message}', 'WARN')
+api_breaker = CircuitBreaker(log, BREAKER_FAILURES, BREAKER_RESET_TIMEOUT, BREAKER_MAX_RESET_TIMEOUT)
+tilt_processes = TiltProcessManager(log, term_timeout=TILT_TERM_TIMEOUT, down_timeout=TILT_DOWN_TIMEOUT, output_file=tilt_up_log_file)
+resource_actions = ResourceActions(api_resource_action, log, max_workers=config.action_concurrency)
+hook_runner = HookRunner(config.transition_hooks, log, config.hook_workers, HOOK_QUEUE_SIZE, count=lambda result: hook_runs.inc(result=result))
+history = HistoryRecorder(history_file, log, retention_days=config.history_days)  # recording only when `history_days` > 0 (see `MonitorEngine`)
+
+
+def get_resource_state_counts(data=None):
+    """Number of resources per state (``ok``, ``pending``, ``error`` and ``warn``), including those not yet updated"""
+    return project_resources(data).state_counts
 
 
 def get_resource_state_summary(data=None):
-    if not data:
-        data = api_get_tilt_status()
-    resources = data.get('uiResources', [])
-    state_counts = {'ok': 0, 'pending': 0, 'error': 0, 'warn': 0}
-    for r in resources:
-        status = r.get('status', {})
-        disable = status.get('disableStatus', {})
-        if disable and disable.get('state') == 'Disabled':
-            continue  # skip disabled
-        # Count warnings if present
-        warn_count = status.get('warningCount')
-        if warn_count and warn_count > 0:
-            state_counts['warn'] += 1
-            continue
-        warnings = status.get('warnings')
-        if warnings and isinstance(warnings, list) and len(warnings) > 0:
-            state_counts['warn'] += 1
-            continue
-        # Use updateStatus and runtimeStatus for other states
-        update_status = status.get('updateStatus')
-        runtime_status = status.get('runtimeStatus')
-        # error
-        if update_status == 'error' or runtime_status == 'error':
-            state_counts['error'] += 1
-        # pending
-        elif update_status in ('pending', 'in_progress') or runtime_status in ('pending', 'in_progress'):
-            state_counts['pending'] += 1
-        # ok/healthy
-        elif update_status == 'ok' and (runtime_status == 'ok' or runtime_status == 'not_applicable'):
-            state_counts['ok'] += 1
+    return format_state_summary(get_resource_state_counts(data))
+
+
+def format_state_summary(state_counts):
     summary_parts = []
     if state_counts['error']:
         summary_parts.append(f"🔴 {state_counts['error']}")
@@ -405,250 +504,163 @@ def get_resource_state_summary(data=None):
     return '  '.join(summary_parts)
 
 
-class TiltMonitorApp(rumps.App):
-    """macOS Menu Bar App for monitoring Tilt"""
-    # ToDo - implement check for updates
-    def __init__(self, short_timer_interval=keepalive_interval, long_timer_interval=sleep_interval, up_on_start=False):
-        super().__init__(APP_NAME, icon=default_icon)
-
-        self.title = ''  # must remain empty, otherwise the renderer attempts to show the title instead of the icon
-        self.menu = []  # Menu will be populated in update_menu_visibility
-        self.icon = gray_icon  # Start with gray until status check
-        self.short_timer = rumps.Timer(self.check_tilt, short_timer_interval)
-        self.long_timer = rumps.Timer(self.check_tilt, long_timer_interval)
-        self.tilt_starting = False
-        self.tilt_process = None
-        self.up_on_start = up_on_start
-        self.show_reload_option = False
-        # Initial check on delayed timer to allow the app to run
-        self.init_timer = rumps.Timer(self.initialize, 1)
-        self.init_timer.start()
-
-    def initialize(self, _):
-        if not is_app_location_valid():
-            move_to_applications()
-
-        is_tilt_running()
-        self.update_menu_visibility()
-        if app.tilt_running:
-            self.activate_short_timer()
-        else:
-            self.activate_long_timer()
-            if self.up_on_start:
-                self.tilt_up(None)
-        self.init_timer.stop()
-
-    def cleanup_and_quit(self, _):
-        for f in glob.glob(f'{tmp_file_pfx}*'):
-            if os.path.isfile(f):
-                log(f'Removing temp file: {f}')
-                os.remove(f)
-        log('Closing application')
-        self.tilt_down(None)
-        rumps.quit_application()
-
-    def activate_short_timer(self):
-        self.long_timer.stop()
-        self.short_timer.start()
-        log(f'Set health check timer to {self.short_timer.interval} seconds')
-
-    def activate_long_timer(self):
-        self.short_timer.stop()
-        self.long_timer.start()
-        log(f'Set health check timer to {self.long_timer.interval} seconds')
-
-    def check_tilt(self, _):
-        try:
-            prv_tilt_running = app.tilt_running
-            is_tilt_running()
-            if app.tilt_running:
-                try:
-                    healthy = is_tilt_healthy()
-                    self.icon = {
-                        True: green_icon,
-                        False: red_icon,
-                        None: gray_icon
-                    }.get(healthy, gray_icon)
-                    if self.tilt_starting and healthy is not None:
-                        self.tilt_starting = False
-                        self.update_menu_visibility()
-                except Exception as api_err:
-                    log(f'Error getting Tilt status: {api_err}', 'ERROR', api_err)
-                    self.icon = red_icon  # API error indicates unhealthy state
-            else:
-                self.icon = transparent_icon
-
-            if prv_tilt_running != app.tilt_running:
-                self.update_menu_visibility()
-                if app.tilt_running:
-                    self.activate_short_timer()
-                else:
-                    self.activate_long_timer()
-        except Exception as tilt_err:
-            self.icon = gray_icon
-            log(f'{tilt_err}', 'ERROR', tilt_err)
-            self.update_menu_visibility()
-
-    @rumps.clicked(MENU_OPT_EDIT_CONFIG)
-    def edit_config(self, _):
-        """Open configuration file in default editor"""
-        try:
-            if not os.path.exists(config_file):
-                load_config()
-            log(f'Edit configuration file: {config_file}')
-            subprocess.call(['open', config_file])
-            self.show_reload_option = True
-            self.update_menu_visibility()
-            rumps_notification('Edit Configuration', "Click 'Reload' from the app menu when done to apply changes")
-        except Exception as edit_err:
-            log(f'Error opening config file: {edit_err}', 'ERROR', edit_err)
-            rumps_alert('Error', f'Could not open configuration file: {edit_err}')
-
-    def about(self, _):
-        """Show the About window"""
-        log('Showing About message window')
-        about_msg = f'Version {APP_VERSION}\n\n{APP_DESCRIPTION}'
-        clicked = rumps_alert(
-            title=APP_NAME,
-            message=about_msg,
-            ok='Close',  # 1
-            other='View on GitHub',  # 0
-            # cancel = 'Cancel',  # -1
-        )
-        log(f'Button clicked: {clicked}')
-        if clicked == 0:
-            log('Opening GitHub page')
-            webbrowser.open(APP_URL)
-
-    def reload_app(self, _):
-        """Reload the application"""
-        log('Reloading application')
-        args = [arg for arg in sys.argv if arg != '--reloaded']
-        os.execv(sys.executable, [sys.executable] + args + ['--reloaded'])
-
-    @rumps.clicked(MENU_OPT_SHOW_LOG)
-    def show_log(self, _):
-        """Open the log file in the default editor"""
-        try:
-            subprocess.call(['open', log_file])
-        except Exception as show_err:
-            log(f'Error opening log file: {show_err}', 'ERROR', show_err)
-            rumps_alert('Error', f'Could not open log file: {show_err}. Please check the log file manually ({log_file}).')
-
-    @rumps.clicked(MENU_OPT_OPEN_UI)
-    def open_ui(self, _):
-        import webbrowser
-        webbrowser.open(tilt_ui_url)
-
-    @rumps.clicked(MENU_OPT_TILT_UP)
-    def tilt_up(self, _):
-        if not is_tiltfile_path_valid(tilt_file_path):
-            log("Cannot 'tilt up': 'tilt_file_path' is not configured or is invalid.", 'WARN')
-            rumps_notification(
-                'Configuration Required',
-                "Click on 'Edit Configuration' and set 'tilt_file_path' to a valid Tiltfile path"
-            )
-            return
-
-        log('Starting Tilt')
-        success, process = run_tilt_command('up')
-        if success:
-            self.tilt_process = process
-            self.tilt_starting = True
-            self.update_menu_visibility()  # Update menu to show "starting" status
-            self.poll_timer = rumps.Timer(self.poll_tilt_started, 1)  # Start a polling timer to check when Tilt is available
-            self.poll_timer.start()
-            # rumps_notification('Tilt Up', 'Tilt has been started')
-
-    def poll_tilt_started(self, _):
-        try:
-            api_get_tilt_status(timeout=1)
-            self.poll_timer.stop()
-            app.tilt_running = True
-            self.activate_short_timer()
-            self.update_menu_visibility()
-            log('Tilt API is now available')
-        except Exception:
-            pass  # API not available yet, will try again on next poll
-
-    @rumps.clicked(MENU_OPT_TILT_DOWN)
-    def tilt_down(self, _):
-        process_killed = False
-        log('Stopping Tilt')
-
-        if self.tilt_starting and hasattr(self, 'poll_timer') and self.poll_timer.is_alive():
-            self.poll_timer.stop()
-
-        if self.tilt_process:
+def update_snapshot(result_list=None, healthy=None):
+    """
+    Cache the latest classified Tilt state; Readers (e.g. metrics scrapes) must use it instead of calling the API.
+    :param result_list: The records from ``get_tilt_status`` (None if Tilt is not running)
+    """
+    prv_snapshot = app.snapshot
+    running = bool(app.tilt_running)
+    resources = result_list if result_list is not None else []
+    disabled = resource_table.disabled if result_list is not None else []
+    state_counts = resource_table.state_counts if result_list is not None else {}
+    # Records and their list are reused while nothing changes, so this is mostly identity checks
+    if running == prv_snapshot['running'] and healthy == prv_snapshot['healthy'] and not prv_snapshot['stale'] \
+            and resources is prv_snapshot['resources'] and disabled is prv_snapshot['disabled'] and state_counts is prv_snapshot['state_counts']:
+        prv_snapshot['timestamp'] = time.time()
+        return
+    snapshot = {
+        'generation': prv_snapshot['generation'],
+        'timestamp': time.time(),
+        'running': running,
+        'resources': resources,
+        'disabled': disabled,
+        'state_counts': state_counts,
+        'healthy': healthy,
+        'stale': False,
+    }
+    changed = any(snapshot[k] != prv_snapshot[k] for k in ('running', 'resources', 'disabled', 'state_counts', 'healthy', 'stale'))
+    if changed:
+        snapshot['generation'] += 1
+    app.snapshot = snapshot
+    if changed:
+        with perf.timer('labels'):
+            index_labels(snapshot)
+        for listener in app.snapshot_listeners:
             try:
-                import signal
-                os.kill(self.tilt_process.pid, signal.SIGTERM)
-                log(f'Terminated Tilt process {self.tilt_process.pid}')
-                process_killed = True
-            except Exception as kill_err:
-                log(f'Failed to terminate Tilt process: {kill_err}', 'ERROR')
-
-        if not process_killed:
-            success, _ = run_tilt_command('down')
-            if not success:
-                return  # Failed to stop Tilt
-
-        self.tilt_starting = False
-        self.tilt_process = None
-        app.tilt_running = False
-        self.activate_long_timer()
-        self.icon = transparent_icon
-        self.update_menu_visibility()
-        # rumps_notification('Tilt Down', 'Tilt has been stopped')
-
-    def update_menu_visibility(self):
-        """Update menu items based on Tilt status"""
-        is_running = app.tilt_running
-
-        self.menu.clear()
-        # ToDo - improve the logic of adding and removing menu items
-        # Add items based on current state
-        if self.tilt_starting:
-            self.menu.add(MENU_OPT_TILT_STARTING)
-            self.menu.add(MENU_OPT_TILT_DOWN)
-            self.menu[MENU_OPT_TILT_DOWN].set_callback(self.tilt_down)
-            if is_running:
-                self.menu.add(MENU_OPT_OPEN_UI)
-                self.menu[MENU_OPT_OPEN_UI].set_callback(self.open_ui)
-        elif is_running:
-            ########## TBD: Add status summary to the menu ##########  ToDo - implement status summary
-            # if MENU_OPT_STATUS_SUMMARY not in self.menu:
-            #     self.menu[MENU_OPT_STATUS_SUMMARY] = rumps.MenuItem(MENU_OPT_STATUS_SUMMARY)
-            # summary_item = self.menu[MENU_OPT_STATUS_SUMMARY]
-            # summary_item.title = get_resource_state_summary()
-            # self.menu.add(None)
-            #########################################################
-            self.menu.add(MENU_OPT_OPEN_UI)
-            self.menu[MENU_OPT_OPEN_UI].set_callback(self.open_ui)
-            self.menu.add(MENU_OPT_TILT_DOWN)
-            self.menu[MENU_OPT_TILT_DOWN].set_callback(self.tilt_down)
-        else:
-            self.menu.add(MENU_OPT_TILT_UP)
-            if is_tiltfile_path_valid(tilt_file_path):
-                self.menu[MENU_OPT_TILT_UP].set_callback(self.tilt_up)
-            else:
-                self.menu[MENU_OPT_TILT_UP].set_callback(None)
+                listener()
+            except Exception as listener_err:
+                log(f'Error in snapshot listener: {listener_err}', 'ERROR', listener_err)
+
+
+def index_labels(snapshot):
+    """Update ``app.label_index`` from the snapshot's resources, disabled ones included (e.g. for "Enable All")"""
+    app.label_index.update((r.name, r.labels, STATES[r.state]) for r in itertools.chain(snapshot['resources'], snapshot['disabled']))
+
+
+def collect_snapshot_metrics():
+    snapshot = app.snapshot
+    lines = format_family('tilt_monitor_up', 'gauge', 'Whether the Tilt API is reachable', [('', (), int(bool(app.tilt_running)))])
+    if snapshot['timestamp'] is not None:
+        lines += format_family('tilt_monitor_snapshot_timestamp_seconds', 'gauge', 'Time of the latest status snapshot',
+                               [('', (), snapshot['timestamp'])], unit='seconds')
+    healthy_value = {True: 1, False: 0}.get(snapshot['healthy'], -1)
+    lines += format_family('tilt_healthy', 'gauge', 'Aggregate Tilt health (1 = ok, 0 = error, -1 = pending/unknown)',
+                           [('', (), healthy_value)])
+
+    states = ('ok', 'pending', 'in_progress', 'error', 'not_applicable', 'none')
+    update_samples, runtime_samples = [], []
+    for r in snapshot['resources']:
+        update_status, runtime_status = r.update_status, r.runtime_status
+        for state in states:
+            update_samples.append(('', (('label', r.label), ('resource', r.name), ('tilt_resource_update_status', state)), int(update_status == state)))
+            runtime_samples.append(('', (('label', r.label), ('resource', r.name), ('tilt_resource_runtime_status', state)), int(runtime_status == state)))
+    lines += format_family('tilt_resource_update_status', 'stateset', 'Tilt resource update status', update_samples)
+    lines += format_family('tilt_resource_runtime_status', 'stateset', 'Tilt resource runtime status', runtime_samples)
+
+    lines += format_family('tilt_resources', 'gauge', 'Number of resources per aggregate state',
+                           [('', (('state', state),), count) for state, count in snapshot['state_counts'].items()])
+    return lines
+
+
+metrics.add_collector(collect_snapshot_metrics)
+
+
+def start_metrics_server(port):
+    if not port:
+        return None
+    try:
+        server = MetricsServer(metrics, int(port)).start()
+        log(f'Serving OpenMetrics on http://127.0.0.1:{port}/metrics')
+        return server
+    except Exception as srv_err:
+        log(f'Could not start metrics endpoint on port {port}: {srv_err}', 'ERROR', srv_err)
+        return None
 
-            self.menu.add(MENU_OPT_EDIT_CONFIG)
-            self.menu[MENU_OPT_EDIT_CONFIG].set_callback(self.edit_config)
 
-            if self.show_reload_option:
-                self.menu.add(MENU_OPT_RELOAD)
-                self.menu[MENU_OPT_RELOAD].set_callback(self.reload_app)
-        # Always shown:
-        self.menu.add(None)  # separator
-        self.menu.add(MENU_OPT_SHOW_LOG)
-        self.menu[MENU_OPT_SHOW_LOG].set_callback(self.show_log)
-        self.menu.add(None)  # separator
-        self.menu.add(MENU_OPT_ABOUT)
-        self.menu[MENU_OPT_ABOUT].set_callback(self.about)
-        quit_item = rumps.MenuItem('Quit', callback=self.cleanup_and_quit)
-        self.menu.add(quit_item)
+def start_ipc_server():
+    if not config.ipc_socket:
+        return None
+    try:
+        server = SnapshotServer(ipc_socket_file, lambda: app.snapshot, format_state_summary, log).start()
+        app.snapshot_listeners.append(server.publish)
+        log(f'Serving status snapshots on {ipc_socket_file}')
+        return server
+    except Exception as srv_err:
+        log(f'Could not start IPC socket {ipc_socket_file}: {srv_err}', 'ERROR', srv_err)
+        return None
+
+
+def save_snapshot():
+    """Persist the snapshot for the next launch's warm start (see ``restore_snapshot``)"""
+    with perf.timer('save_snapshot'):
+        write_snapshot(last_snapshot_file, app.snapshot, resource_table.dump() if app.snapshot['running'] else [])
+
+
+def restore_snapshot():
+    """
+    Show the snapshot saved by the previous run until the first live status check, marked as ``stale``.
+    The first check then diffs the live resources against the restored records (see ``ResourceTable.restore``).
+    :return: True if a snapshot was restored
+    """
+    saved = read_snapshot(last_snapshot_file)
+    if saved is None:
+        return False
+    try:
+        resource_table.restore(saved['resources'])
+    except Exception as restore_err:
+        log(f'Ignoring the saved snapshot ({last_snapshot_file}): {restore_err}', 'WARN')
+        return False
+    running = bool(saved['running'])
+    app.tilt_running = running
+    app.tilt_healthy = saved['healthy'] if running else None
+    app.snapshot = {
+        'generation': saved['generation'],
+        'timestamp': saved['timestamp'],
+        'running': running,
+        'resources': resource_table.resources if running else [],
+        'disabled': resource_table.disabled if running else [],
+        'state_counts': resource_table.state_counts if running else {},
+        'healthy': app.tilt_healthy,
+        'stale': True,
+    }
+    index_labels(app.snapshot)
+    saved_at = datetime.fromtimestamp(saved['timestamp']).strftime('%Y-%m-%d %H:%M:%S') if saved['timestamp'] else 'unknown'
+    log(f'Restored the last known status (saved {saved_at}, {len(app.snapshot["resources"])} resources); Stale until the first check')
+    return True
+
+
+def update_prompt_status():
+    if not app.snapshot['stale']:  # live snapshots only: prompt readers cannot tell a restored status from a current one
+        write_prompt_status(prompt_status_file, app.snapshot)
+
+
+def start_prompt_status():
+    if config.prompt_status:
+        app.snapshot_listeners.append(update_prompt_status)
+
+
+def stop_services():
+    """Stop serving the snapshot to local clients (IPC socket, prompt status file) before exiting"""
+    resource_actions.shutdown()
+    hook_runner.shutdown()
+    history.close()
+    profiler.stop()
+    if app.ipc_server:
+        app.ipc_server.stop()
+        app.ipc_server = None
+    if config.prompt_status and os.path.exists(prompt_status_file):
+        os.remove(prompt_status_file)
 
 
 def main():
@@ -657,22 +669,44 @@ def main():
             sys.argv.remove('--reloaded')
         else:
             rotate_logs()
+            run_in_background(prune_logs, 'prune-logs')
 
         log(f'============ {APP_NAME} {APP_VERSION} ============')
-        update_environ()
-        get_terminal_environ()
-
         log('Parse configuration')
         args = parser.parse_args()
 
+        # Each takes a login shell; Neither is needed for the icon or the first status check, so they load meanwhile
+        run_in_background(update_environ, 'update-environ')
+        if not args.headless:
+            run_in_background(get_terminal_environ, 'terminal-environ')  # in headless mode, loaded on demand for `tilt up`
+
+        if args.base_url:
+            config.set_base_url(args.base_url)
+
         env_args = {ev[0]: ev[1] for ev in os.environ.items() if ev[0].startswith('TMB_')}
 
-        time_interval = keepalive_interval
+        time_interval = config.keepalive_interval
         if args.time_interval is not None:
             time_interval = int(args.time_interval)
         elif env_args.get('TMB_TIME_INTERVAL', '').isdigit():
             time_interval = int(env_args['TMB_TIME_INTERVAL'])
+        if args.profile or env_args.get('TMB_PROFILE', '').lower() in ('1', 'true', 'yes'):
+            profiler.start()
+
+        if config.warm_start:
+            restore_snapshot()
+            app.snapshot_listeners.append(save_snapshot)
+        start_metrics_server(config.metrics_port)
+        app.ipc_server = start_ipc_server()
+        start_prompt_status()
+
+        if args.headless:
+            from tilt_monitor.headless import run_headless
+            log(f'Starting headless monitor with timer interval: {time_interval} seconds')
+            run_headless(time_interval, config.sleep_interval, output=args.output, up_on_start=args.up)
+            return
 
+        from tilt_monitor.menubar import TiltMonitorApp  # requires rumps (macOS only)
         log(f'Starting menu bar app with timer interval: {time_interval} seconds')
         app_instance = TiltMonitorApp(short_timer_interval=time_interval, up_on_start=args.up)
         app_instance.run()
@@ -684,4 +718,6 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    # Run through the package module, so the front ends (which import it) share a single copy of the app state
+    from tilt_monitor.tilt_monitor import main as package_main
+    package_main()
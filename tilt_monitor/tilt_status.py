@@ -1,9 +1,24 @@
+import argparse
 from colorama import Fore, Style
+import csv
+from functools import partial
+from datetime import datetime
+import json
 import os
+import re
+import sqlite3
 import sys
-import traceback
+import time
 
-from tilt_monitor.tilt_monitor import log, get_tilt_status
+from tilt_monitor.actions import ACTIONS, RESULT_FIELDS
+from tilt_monitor.history import connect, list_transitions, state_periods, tick_summary
+from tilt_monitor.ipc import query_monitor
+from tilt_monitor.labels import LabelIndex, label_sort_key
+from tilt_monitor.perf import format_summary
+from tilt_monitor.prompt import DEFAULT_FORMAT, print_prompt_status
+from tilt_monitor.startup import format_report, list_reports, load_report
+from tilt_monitor.resources import STATES, Resource
+from tilt_monitor.tilt_monitor import log, get_tilt_status, resource_actions, resource_table, history_file, ipc_socket_file, perf_stats_file, startup_reports_dir
 
 
 script_name = os.path.splitext(os.path.basename(__file__))[0]
@@ -22,6 +37,18 @@ status_colors = {
     'n/a': GRY,
 }
 
+OUTPUT_FORMATS = ('table', 'json', 'ndjson', 'csv')
+OUTPUT_FIELDS = ('label', 'name', 'update_status', 'runtime_status', 'state')
+HISTORY_FIELDS = ('name', 'count', 'seconds', 'share', 'last')
+EVENT_FIELDS = ('ts', 'kind', 'resource', 'state', 'update_status', 'runtime_status')
+DURATION_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+STATE_ORDER = {'error': 0, 'unknown': 1, 'pending': 2, 'ok': 3, 'disabled': 4}  # worst first
+SORT_KEYS = {
+    'label': None,  # the order of `get_tilt_status` (already grouped by label)
+    'name': lambda r: r.name,
+    'state': lambda r: (STATE_ORDER[r.state_name], r.name),
+}
+
 
 def text_color(text, color=None):
     if color is None:
@@ -29,37 +56,335 @@ def text_color(text, color=None):
     return f'{color}{text}{NC}'
 
 
-def print_status_results(result_list):
+def iter_status_rows(result_list, names=None, states=None, sort='label'):
+    """
+    Yield the resources of ``result_list`` (``Resource`` records) as dicts of ``OUTPUT_FIELDS``, lazily.
+    :param names: Only these resources (set, e.g. from ``LabelIndex.select``), or None for all
+    :param states: Only resources in one of these states (set of ``STATES``), or None for all
+    :param sort: A key of ``SORT_KEYS``; Sorting by anything but ``label`` has to collect the (filtered) records first
+    """
+    records = (r for r in result_list if names is None or r.name in names)
+    if states is not None:
+        records = (r for r in records if r.state_name in states)
+    if SORT_KEYS[sort] is not None:
+        records = sorted(records, key=SORT_KEYS[sort])
+    return ({'label': r.label, 'name': r.name, 'update_status': r.update_status, 'runtime_status': r.runtime_status,
+             'state': r.state_name} for r in records)
+
+
+def write_ndjson(rows, out=sys.stdout):
+    for row in rows:
+        out.write(json.dumps(row) + '\n')
+
+
+def write_json(rows, out=sys.stdout):
+    """Write a JSON array, one element per line as the rows come in (nothing is buffered)"""
+    sep = '[\n'
+    for row in rows:
+        out.write(sep + json.dumps(row))
+        sep = ',\n'
+    out.write('[]\n' if sep == '[\n' else '\n]\n')
+
+
+def write_csv(rows, out=sys.stdout, fields=OUTPUT_FIELDS):
+    writer = csv.DictWriter(out, fieldnames=fields, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def print_status_results(rows, out=sys.stdout):
+    """Print a colorized table, with columns sized to the data"""
     log('Print Tilt status result table')
-    prv_label = result_list[0][0]
-    i = 1
+    rows = list(rows)
+    if not rows:
+        out.write('\nTilt Status\n\nNo resources\n')
+        return
+
+    def _value(text):
+        return 'n/a' if text == 'not_applicable' else text
+
+    headers = ('', 'Label', 'Name', 'Update Status', 'Runtime Status')
+    widths = [len(str(len(rows))), len(headers[1]), len(headers[2]), len(headers[3]), len(headers[4])]
+    for row in rows:
+        widths[1] = max(widths[1], len(row['label']))
+        widths[2] = max(widths[2], len(row['name']))
+        widths[3] = max(widths[3], len(_value(row['update_status'])))
+    separator = '-+-'.join('-' * w for w in widths) + '\n'
+
+    def _status(text, width):
+        value = _value(text)
+        return text_color(value.upper().ljust(width), status_colors.get(value))
+
+    out.write('\nTilt Status\n\n')
+    out.write(' | '.join(h.ljust(w) for h, w in zip(headers, widths)).rstrip() + '\n')
+    out.write(separator)
+    prv_label = rows[0]['label']
+    for i, row in enumerate(rows, start=1):
+        if prv_label != row['label']:
+            out.write(separator)
+        out.write(f"{str(i).ljust(widths[0])} | {row['label'].ljust(widths[1])} | {row['name'].ljust(widths[2])} | "
+                  f"{_status(row['update_status'], widths[3])} | {_status(row['runtime_status'], 0)}\n")
+        prv_label = row['label']
+
+
+OUTPUT_WRITERS = {
+    'table': print_status_results,
+    'json': write_json,
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
+
+
+def print_action_results(results, out=sys.stdout):
+    """Print one line per resource as its action completes, then a summary"""
+    done = failed = 0
+    for result in results:
+        done += 1
+        if result['ok']:
+            out.write(f"{text_color('OK'.ljust(5), GRN)} {result['action']} {result['name']} ({result['seconds']:.1f}s)\n")
+        else:
+            failed += 1
+            out.write(f"{text_color('ERROR', RED)} {result['action']} {result['name']}: {result['error']}\n")
+        out.flush()
+    out.write(f'\n{done - failed} of {done} resources done' + (f', {failed} failed\n' if failed else '\n'))
+
+
+ACTION_WRITERS = dict(OUTPUT_WRITERS, table=print_action_results, csv=partial(write_csv, fields=RESULT_FIELDS))
+
+
+def run_action(action, names, output_format='table'):
+    """Run a bulk resource action and write its per-resource results; Returns the number of failed resources"""
+    failed = []
+
+    def _results():
+        for result in resource_actions.run(action, names):
+            if not result['ok']:
+                failed.append(result['name'])
+            yield result
 
-    def _status(text):
-        value = 'n/a' if text == 'not_applicable' else text
-        status_text = text_color(value.upper().ljust(15), status_colors.get(value))
-        return status_text
+    log(f'Running `{action}` on {len(names)} resources: {", ".join(names)}')
+    ACTION_WRITERS[output_format](_results())
+    return len(failed)
 
-    print('\nTilt Status\n')
-    print('   | Label     | Name                 | Update Status   | Runtime Status')
-    print('---+-----------+----------------------+-----------------+---------------')
 
-    for r_label, r_name, update_status, runtime_status in result_list:
-        if prv_label != r_label:
-            print('---+-----------+----------------------+-----------------+---------------')
-        print(f'{str(i).ljust(2)} | {r_label.ljust(9)} | {r_name.ljust(20)} | {_status(update_status)} | {_status(runtime_status)}')
-        i += 1
-        prv_label = r_label
+def print_perf_stats():
+    """Print the hot-path timing stats last dumped by the running menu bar app"""
+    if not os.path.exists(perf_stats_file):
+        print('No performance stats available (is Tilt Monitor running with `perf_stats` enabled?)')
+        return
+    with open(perf_stats_file, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    ts = datetime.fromtimestamp(stats['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+    print(f'\nTilt Monitor Performance Stats (as of {ts}, last {stats["window"]} samples per stage)\n')
+    print(format_summary(stats['stages']))
+
+
+def print_startup_report(run_id=None):
+    """Print a startup report (the latest by default), compared with the run before it"""
+    reports = list_reports(startup_reports_dir)
+    if run_id:
+        reports = reports[:next((i + 1 for i, path in enumerate(reports) if os.path.basename(path).startswith(run_id)), 0)]
+    if not reports:
+        print('No startup reports found' + (f' for run {run_id}' if run_id else ''))
+        sys.exit(1)
+    previous = load_report(reports[-2]) if len(reports) > 1 else None
+    print(format_report(load_report(reports[-1]), previous))
+
+
+def parse_time(text):
+    """A duration back from now (``30m``, ``12h``, ``7d``, ``2w``) or a local date/time (``2024-05-01``, ``2024-05-01T08:00``); Returns epoch seconds"""
+    match = re.fullmatch(r'(\d+)([mhdw])', text)
+    if match:
+        return time.time() - int(match.group(1)) * DURATION_UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid time: {text!r} (e.g. 30m, 12h, 7d, 2w or 2024-05-01T08:00)') from None
+
+
+def format_time(ts):
+    return None if ts is None else datetime.fromtimestamp(ts).astimezone().isoformat(timespec='seconds')
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    parts = [f'{value}{unit}' for value, unit in ((days, 'd'), (hours, 'h'), (minutes, 'm'), (seconds, 's')) if value]
+    return ' '.join(parts[:2]) or '0s'
+
+
+def print_history_results(rows, state, since, until, ticks, out=sys.stdout):
+    """Print the ``state_periods`` rows as a table, followed by the status check metrics"""
+    span = f"{datetime.fromtimestamp(since).strftime('%Y-%m-%d %H:%M')} - {datetime.fromtimestamp(until).strftime('%Y-%m-%d %H:%M')}"
+    out.write(f'\nTilt Status History ({span})\n\n')
+    if not rows:
+        out.write(f'No resource was in the {state} state\n')
+    else:
+        headers = ('Name', 'Times', f'Time in {state}', 'Share', 'Last')
+        cells = [(row['name'], str(row['count']), format_duration(row['seconds']), f"{row['share'] * 100:.1f}%",
+                  row['last'][:16].replace('T', ' ') if row['last'] else '-') for row in rows]
+        widths = [max(len(headers[i]), *(len(c[i]) for c in cells)) for i in range(len(headers))]
+        out.write(' | '.join(h.ljust(w) for h, w in zip(headers, widths)).rstrip() + '\n')
+        out.write('-+-'.join('-' * w for w in widths) + '\n')
+        color = status_colors.get(state)
+        for c in cells:
+            out.write(f"{c[0].ljust(widths[0])} | {text_color(c[1].ljust(widths[1]), color if c[1] != '0' else None)} | "
+                      f"{c[2].ljust(widths[2])} | {c[3].ljust(widths[3])} | {c[4]}\n")
+    if ticks['ticks']:
+        out.write(f"\nStatus checks: {ticks['ticks']:,}; Tilt running {ticks['running'] * 100:.1f}% of the time"
+                  + (f", healthy {ticks['healthy'] * 100:.1f}% of that" if ticks['healthy'] is not None else '')
+                  + f"; {ticks['avg_errors']:.1f} errored resources on average (max {ticks['max_errors']})"
+                  + f"; {ticks['avg_seconds'] * 1000:.0f} ms per check on average (max {ticks['max_seconds'] * 1000:.0f} ms)\n")
+
+
+def print_history_events(rows, out=sys.stdout):
+    for row in rows:
+        subject = row['resource'] or f"(Tilt {row['kind']})"
+        statuses = f" ({row['update_status']}/{row['runtime_status']})" if row['update_status'] or row['runtime_status'] else ''
+        out.write(f"{row['ts'][:19].replace('T', ' ')}  {subject}: {text_color(row['state'], status_colors.get(row['state']))}{statuses}\n")
+
+
+def print_history(args):
+    """Query the status history recorded by the monitor; Returns the exit code"""
+    if not os.path.exists(history_file):
+        print('No status history recorded yet (is Tilt Monitor running, with `history_days` > 0?)')
+        return 1
+    until = args.until if args.until is not None else time.time()
+    start = time.perf_counter()
+    conn = connect(history_file, readonly=True)
+    try:
+        if args.events:
+            rows = list_transitions(conn, args.since, until, args.name)
+        else:
+            rows = [row for row in state_periods(conn, args.since, until, args.state, args.name) if args.name or row['seconds'] or row['count']]
+            ticks = tick_summary(conn, args.since, until)
+    finally:
+        conn.close()
+    log(f'History query took {(time.perf_counter() - start) * 1000:.1f} ms ({len(rows)} rows)')
+    for row in rows:
+        for key in ('ts', 'last'):
+            if key in row:
+                row[key] = format_time(row[key])
+    if args.format != 'table':
+        writer = OUTPUT_WRITERS[args.format]
+        if args.format == 'csv':
+            writer = partial(write_csv, fields=EVENT_FIELDS if args.events else HISTORY_FIELDS)
+        writer(rows)
+    elif args.events:
+        print_history_events(rows)
+    else:
+        print_history_results(rows, args.state, args.since, until, ticks)
+    return 0
+
+
+def get_monitor_status():
+    """
+    Get the status snapshot cached by a running monitor (no Tilt API call); Returns None if no monitor serves a live one
+    (e.g. right after a warm start, while it still serves the previous run's restored snapshot)
+    """
+    response = query_monitor(ipc_socket_file, {'request': 'status'})
+    if not response or not response.get('ok') or response.get('timestamp') is None or response.get('stale'):
+        return None
+    return response
+
+
+parser = argparse.ArgumentParser(description='Print the status of Tilt resources',
+                                 epilog='Subcommands: `history` queries the recorded status history (see `%(prog)s history --help`)')
+parser.add_argument('--stats', action='store_true', help='Print hot-path timing stats of the running menu bar app')
+parser.add_argument('--direct', action='store_true', help='Query the Tilt API directly, even if a running monitor can serve its cached status')
+parser.add_argument('--prompt', nargs='?', const=DEFAULT_FORMAT, default=None, metavar='FORMAT',
+                    help='Print a one-line status for shell prompts from the running monitor\'s status file (no API call). '
+                         'FORMAT placeholders: {state} {ok} {pending} {error} {warn} {total} {generation}')
+parser.add_argument('--startup', nargs='?', const='', default=None, metavar='RUN_ID',
+                    help='Print the latest (or the given) `tilt up` startup report, compared with the run before it')
+parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='table', help='Output format (default: table)')
+parser.add_argument('-l', '--label', action='append', default=None, metavar='LABEL',
+                    help='Only show resources with this label, primary or not (can be repeated)')
+parser.add_argument('-s', '--state', action='append', default=None, choices=STATES,
+                    help='Only show resources in this state (can be repeated)')
+parser.add_argument('--sort', choices=tuple(SORT_KEYS), default='label',
+                    help='Sort by label group (default), name, or state (errors first)')
+parser.add_argument('-a', '--action', choices=ACTIONS, default=None,
+                    help='Trigger, enable or disable the selected resources (--name, --label and/or --state, e.g. `-a trigger -s error`) '
+                         'and print the result of each')
+parser.add_argument('-n', '--name', action='append', default=None, metavar='NAME',
+                    help='Only this resource (can be repeated); With --action only, names are used as given')
+parser.add_argument('-p', '--parallel', type=int, default=None, metavar='N',
+                    help='Max resources acted on at a time (default: `action_concurrency` from the configuration)')
+
+history_parser = argparse.ArgumentParser(prog=f'{parser.prog} history',
+                                         description='How often, and for how long, resources were in a state (recorded by the running monitor)')
+history_parser.add_argument('-n', '--name', action='append', default=None, metavar='NAME', help='Only this resource (can be repeated)')
+history_parser.add_argument('-s', '--state', choices=STATES, default='error', help='The state to report on (default: error)')
+history_parser.add_argument('--since', type=parse_time, default='7d', metavar='WHEN',
+                            help='Start of the time span: a duration back from now (30m, 12h, 7d, 2w) or a date/time (2024-05-01T08:00) (default: 7d)')
+history_parser.add_argument('--until', type=parse_time, default=None, metavar='WHEN', help='End of the time span (default: now)')
+history_parser.add_argument('-e', '--events', action='store_true', help='List the recorded transitions instead')
+history_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='table', help='Output format (default: table)')
 
 
 def main():
     try:
         log(f'============ {script_name} Start ============')
-        tilt_status = get_tilt_status()
-        print_status_results(tilt_status)
+        if sys.argv[1:2] == ['history']:
+            sys.exit(print_history(history_parser.parse_args(sys.argv[2:])))
+        args = parser.parse_args()
+        if args.prompt is not None:
+            sys.exit(print_prompt_status(args.prompt))
+        if args.stats:
+            print_perf_stats()
+            return
+        if args.startup is not None:
+            print_startup_report(args.startup)
+            return
+        if args.action:
+            if not (args.name or args.label or args.state):
+                parser.error('--action requires a selection: --name, --label and/or --state')
+            if args.parallel:
+                resource_actions.max_workers = max(1, args.parallel)
+            if not (args.label or args.state):  # explicit names are used as given (e.g. of resources left out by `resource_filters`)
+                sys.exit(1 if run_action(args.action, args.name, args.format) else 0)
+        monitor_status = None if args.direct else get_monitor_status()
+        if monitor_status is None:
+            tilt_status = get_tilt_status()
+            disabled = resource_table.disabled
+        else:
+            log(f'Using the cached status of the running monitor (generation {monitor_status["generation"]})')
+            if not monitor_status['running']:
+                print('Tilt is not running')
+                sys.exit(1)
+            tilt_status, disabled = ([Resource.from_statuses(r['label'], r['name'], r['update_status'], r['runtime_status'], tuple(r.get('labels') or ()),
+                                                             r['state'] == 'disabled') for r in monitor_status.get(key) or ()]
+                                     for key in ('resources', 'disabled'))
+        if args.action == 'enable' or 'disabled' in (args.state or ()):  # otherwise left out, with `skip_disabled`
+            tilt_status = sorted(tilt_status + disabled, key=lambda r: label_sort_key(r.label))
+        names = set(args.name) if args.name else None
+        if args.label:
+            label_index = LabelIndex()
+            label_index.update((r.name, r.labels, r.state_name) for r in tilt_status)
+            names = label_index.select(args.label) if names is None else names & label_index.select(args.label)
+        rows = iter_status_rows(tilt_status, names=names,
+                                states=set(args.state) if args.state else None, sort=args.sort)
+        if args.action:
+            selected = [row['name'] for row in rows]
+            if not selected:
+                print('No resources selected')
+                sys.exit(1)
+            sys.exit(1 if run_action(args.action, selected, args.format) else 0)
+        OUTPUT_WRITERS[args.format](rows)
     except KeyboardInterrupt:
         sys.exit(0)
+    except sqlite3.Error as db_err:
+        log(db_err, 'ERROR', db_err)
+        print(f'Error reading the status history: {db_err}')
+        sys.exit(1)
+    except BrokenPipeError:
+        sys.stderr.close()  # output piped to a reader that exited early (e.g. `head`)
+        sys.exit(0)
     except Exception as err:
-        log(err, 'ERROR', traceback.format_exc())
+        log(err, 'ERROR', err)
         sys.exit(1)
 
 